@@ -0,0 +1,134 @@
+"""
+Process-wide cache of the static assets every render uses (intro video,
+outro card, click sound, background music), as MoviePy clips or, for the
+audio mixer, as decoded PCM samples.
+
+A one-shot CLI run loads each asset once as before; a job queue ``work``
+process keeps the opened readers and decoded images across jobs. Entries are
+keyed by path, size and mtime, so replacing a file on disk is picked up on
+the next job. MoviePy's ``with_*`` methods return copies, so callers can
+freely derive clips from the shared instances but must not close them.
+
+Per-job inputs (voice-overs) go through the same cache, so it is bounded:
+at most ``MEMO_SIZE`` entries and ``MEMO_BYTES`` of decoded samples and
+pixels, dropping the least recently used first. Dropped entries are not
+closed (a render may still hold them); their readers close when collected.
+"""
+import os
+import subprocess
+from collections import OrderedDict
+
+import numpy as np
+from moviepy import AudioFileClip, ImageClip, VideoClip, VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+SAMPLE_RATE = 44100
+
+MEMO_SIZE = 32
+MEMO_BYTES = 256 * 1024 * 1024
+
+_cache = OrderedDict()  # key -> (file stamp, asset, bytes)
+_cached_bytes = 0
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _nbytes(asset):
+    """Decoded samples or pixels held by ``asset`` (0 for readers and probes)."""
+    if isinstance(asset, np.ndarray):
+        return asset.nbytes
+    if isinstance(asset, ImageClip):
+        mask = asset.mask
+        return asset.img.nbytes + (_nbytes(mask) if mask is not None else 0)
+    return 0
+
+
+def _forget(key):
+    global _cached_bytes
+    _cached_bytes -= _cache.pop(key)[2]
+
+
+def _load(loader, path, *params):
+    global _cached_bytes
+    path_key, size, mtime = _file_key(path)
+    key = (loader.__name__, path_key) + params
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == (size, mtime):
+        _cache.move_to_end(key)
+        return entry[1]
+    if entry is not None:
+        _forget(key)
+    asset = loader(path, *params)
+    nbytes = _nbytes(asset)
+    if nbytes > MEMO_BYTES:  # would evict everything else
+        return asset
+    _cache[key] = ((size, mtime), asset, nbytes)
+    _cached_bytes += nbytes
+    while len(_cache) > MEMO_SIZE or _cached_bytes > MEMO_BYTES:
+        _forget(next(iter(_cache)))
+    return asset
+
+
+def load_audio(path):
+    return _load(AudioFileClip, path)
+
+
+def _scaled_video(path, size):
+    return VideoFileClip(path, target_resolution=size)
+
+
+def load_video(path, size=None):
+    """The video at ``path``, scaled to ``size`` (w, h) by ffmpeg if given."""
+    if size is None:
+        return _load(VideoFileClip, path)
+    return _load(_scaled_video, path, tuple(size))
+
+
+def load_image(path):
+    return _load(ImageClip, path)
+
+
+def load_info(path):
+    """Stream properties of a media file (MoviePy's ``ffmpeg_parse_infos``)."""
+    return _load(ffmpeg_parse_infos, path)
+
+
+def lazy_video(path, size=None):
+    """
+    The video at ``path`` (scaled to ``size`` if given) as a clip sized and
+    timed from a probe of the file, which opens its ffmpeg reader only when
+    a frame is requested. Renders that take the video from the render cache
+    never decode it.
+    """
+    info = load_info(path)
+    clip = VideoClip(duration=info["video_duration"])
+    clip.frame_function = lambda t: load_video(path, size).get_frame(t)
+    clip.size = tuple(size or info["video_size"])
+    clip.fps = info["video_fps"]
+    return clip
+
+
+def decode_samples(path):
+    """Decode an audio file to float32 stereo samples at ``SAMPLE_RATE``."""
+    cmd = [FFMPEG_BINARY, "-loglevel", "error", "-i", path, "-vn"]
+    cmd += ["-f", "f32le", "-ac", "2", "-ar", str(SAMPLE_RATE), "-"]
+    pcm = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(pcm, np.float32).reshape(-1, 2)
+
+
+def load_samples(path):
+    return _load(decode_samples, path)
+
+
+def clear():
+    """Close and drop every cached asset."""
+    global _cached_bytes
+    for _, asset, _ in _cache.values():
+        if hasattr(asset, "close"):
+            asset.close()
+    _cache.clear()
+    _cached_bytes = 0
@@ -0,0 +1,114 @@
+"""
+Audio mixing stage: the voice-over, background music and cursor clicks of a
+video summed as NumPy sample arrays and streamed to ffmpeg as raw PCM.
+
+Every source is decoded once per process (``assets.load_samples``); clicks
+are placed by sample offset and gains applied vectorized, one chunk at a time,
+instead of evaluating a tree of ``CompositeAudioClip``s and writing a temp
+audio file before muxing.
+"""
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from scripts.assets import SAMPLE_RATE, load_samples
+
+CHUNK_SIZE = SAMPLE_RATE  # one second per chunk
+
+
+class AudioMix:
+    """
+    A sum of sample arrays placed on a timeline of ``duration`` seconds.
+    Like MoviePy's audio writer, the mix is clipped to +-0.99.
+    """
+
+    def __init__(self, duration, fps=SAMPLE_RATE):
+        self.fps = fps
+        self.nframes = int(round(duration * fps))
+        self.tracks = []
+
+    def add(self, source, start=0.0, gain=1.0, duration=None):
+        """
+        Add ``source`` (an audio file path or a float (n, 2) sample array) at
+        ``start`` seconds, scaled by ``gain`` and cut to ``duration`` seconds
+        if given. Anything past the end of the mix is dropped.
+        """
+        samples = load_samples(source) if isinstance(source, str) else source
+        if duration is not None:
+            samples = samples[: int(round(duration * self.fps))]
+        self.tracks.append((samples, int(round(start * self.fps)), gain))
+        return self
+
+    def mix(self, first, stop):
+        """Mixed samples ``first:stop`` as a float32 (n, 2) array."""
+        out = np.zeros((stop - first, 2), np.float32)
+        for samples, offset, gain in self.tracks:
+            a = max(first, offset)
+            b = min(stop, offset + len(samples))
+            if a >= b:
+                continue
+            part = samples[a - offset : b - offset]
+            if gain != 1.0:
+                part = part * np.float32(gain)
+            out[a - first : b - first] += part
+        return np.clip(out, -0.99, 0.99, out=out)
+
+    def chunks(self, size=CHUNK_SIZE):
+        for first in range(0, self.nframes, size):
+            yield self.mix(first, min(first + size, self.nframes))
+
+    def input_args(self, source):
+        """ffmpeg input options reading this mix's raw PCM from ``source``."""
+        return ["-f", "f32le", "-ar", str(self.fps), "-ac", "2", "-i", source]
+
+    def feed(self, f):
+        for chunk in self.chunks():
+            f.write(chunk.tobytes())
+
+
+class AudioFeed:
+    """
+    Streams an ``AudioMix`` into an ffmpeg child on an extra pipe, from a
+    thread, so it can be read alongside video frames on stdin. Spawn the
+    process with ``input_args`` and ``pass_fds``, then call ``start``.
+
+    Windows cannot hand extra pipes to a child; there the PCM goes through a
+    temporary file instead.
+    """
+
+    def __init__(self, mix):
+        self.mix = mix
+        self.thread = None
+        self.path = None
+        if os.name == "nt":
+            fd, self.path = tempfile.mkstemp(suffix=".f32")
+            with os.fdopen(fd, "wb") as f:
+                mix.feed(f)
+            self.input_args = mix.input_args(self.path)
+            self.pass_fds = ()
+        else:
+            self.read_fd, self.write_fd = os.pipe()
+            self.input_args = mix.input_args("pipe:%d" % self.read_fd)
+            self.pass_fds = (self.read_fd,)
+
+    def start(self):
+        if self.path is not None:
+            return
+        os.close(self.read_fd)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            with os.fdopen(self.write_fd, "wb") as f:
+                self.mix.feed(f)
+        except BrokenPipeError:  # ffmpeg died; its exit status says why
+            pass
+
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
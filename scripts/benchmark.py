@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""
+Benchmark the render pipeline on synthetic inputs and emit JSON.
+
+Everything is generated offline in a temporary directory: gradient-and-noise
+images, a sine-wave voice-over, an SRT with a cue every two seconds, a test
+pattern intro and a flat outro card. The Decory layout always takes five
+images, so cases vary the voice-over length instead, which sets the number
+of frames and subtitle cues. Every case (resolution x duration x engine)
+runs in its own process so peak RSS and caches are per case, and reports:
+
+- ``timeline_seconds``: ``build_timeline`` (layout, cursor, captions, audio)
+- ``frame_ms``: cost of composing one frame at evenly spaced frame times
+- ``caption_ms``: cost of blending the active subtitle onto a frame
+- ``render_seconds``, ``encode_fps``: a full uncached render
+- ``peak_rss_mb`` (this process) and ``ffmpeg_peak_rss_mb`` (children)
+- ``output_bytes``
+
+With ``--baseline`` the relative change of each number against an earlier
+run is added to the matching cases, e.g.::
+
+    python scripts/benchmark.py --output before.json
+    python scripts/benchmark.py --baseline before.json --output after.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from PIL import Image
+
+from moviepy.config import FFMPEG_BINARY
+
+from scripts.instrumentation import peak_rss_mb
+
+SAMPLE_RATE = 44100
+IMAGE_COUNT = 5  # one main image plus the four of the grid
+METRICS = [
+    "timeline_seconds",
+    "frame_ms",
+    "caption_ms",
+    "render_seconds",
+    "encode_fps",
+    "peak_rss_mb",
+    "output_bytes",
+]
+
+
+# ─────────────────────────── Synthetic inputs ────────────────────
+def make_image(path, seed, size=(1200, 1200)):
+    rng = np.random.default_rng(seed)
+    w, h = size
+    x = np.linspace(0, 1, w)[None, :, None]
+    y = np.linspace(0, 1, h)[:, None, None]
+    base = rng.uniform(0, 255, 3) * x + rng.uniform(0, 255, 3) * y
+    noise = rng.normal(0, 12, (h, w, 3))
+    pixels = np.clip(base / 2 + 40 + noise, 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+
+
+def make_voice(path, duration, frequency=220.0):
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.2 * np.sin(2 * np.pi * frequency * t)
+    pcm = (np.repeat(tone[:, None], 2, axis=1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+
+def make_subtitles(path, duration, every=2.0):
+    from scripts.transcribe import write_srt
+
+    starts = np.arange(0, duration - every / 2, every)
+    write_srt(
+        [
+            (start, start + every * 0.9, "Benchmark caption number %d" % i)
+            for i, start in enumerate(starts, start=1)
+        ],
+        path,
+    )
+
+
+def make_intro(path, size, duration=3.2):
+    subprocess.run(
+        [FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi"]
+        + ["-i", "testsrc2=size=%dx%d:rate=30:duration=%s" % (size + (duration,))]
+        + ["-c:v", "libx264", "-pix_fmt", "yuv420p", path],
+        check=True,
+    )
+
+
+def make_inputs(workdir, sizes, durations):
+    """Generate every input file; returns the paths shared by all cases."""
+    inputs = {"images": [], "voice": {}, "subtitles": {}, "intro": {}, "outro": {}}
+    for i in range(IMAGE_COUNT):
+        path = os.path.join(workdir, "image-%d.png" % i)
+        make_image(path, seed=i)
+        inputs["images"].append(path)
+    for duration in durations:
+        name = "%g" % duration
+        inputs["voice"][name] = os.path.join(workdir, "voice-%s.wav" % name)
+        make_voice(inputs["voice"][name], duration)
+        inputs["subtitles"][name] = os.path.join(workdir, "voice-%s.srt" % name)
+        make_subtitles(inputs["subtitles"][name], duration)
+    for size in sizes:
+        name = "%dx%d" % size
+        inputs["intro"][name] = os.path.join(workdir, "intro-%s.mp4" % name)
+        make_intro(inputs["intro"][name], size)
+        inputs["outro"][name] = os.path.join(workdir, "outro-%s.png" % name)
+        Image.new("RGB", size, (32, 48, 96)).save(inputs["outro"][name])
+    return inputs
+
+
+# ────────────────────────────── Cases ────────────────────────────
+def run_case(case):
+    """Measure one case in this process (see the module docstring)."""
+    from scripts.captions import CaptionTrack
+    from scripts.moviepy_create_video import (
+        _timeline_layers,
+        build_parser,
+        build_timeline,
+        render,
+    )
+    from scripts.numpy_renderer import TimelineCanvas
+
+    width, height = case["size"]
+    name = "%dx%d" % (width, height)
+    duration = "%g" % case["duration"]
+    inputs = case["inputs"]
+    output = os.path.join(
+        case["workdir"], "out-%s-%s-%s.mp4" % (name, duration, case["engine"])
+    )
+    engine, _, mode = case["engine"].partition("-")
+    argv = ["--engine", engine, "--fps", str(case["fps"])]
+    if mode == "low-memory":
+        argv.append("--low-memory")
+    argv += ["--width", str(width), "--height", str(height)]
+    argv += ["--profile", case["profile"], "--no-render-cache", "--output", output]
+    argv += ["--audio", inputs["voice"][duration]]
+    argv += ["--subtitles", inputs["subtitles"][duration]]
+    argv += ["--intro", inputs["intro"][name], "--outro", inputs["outro"][name]]
+    argv += inputs["images"]
+    args = build_parser().parse_args(argv)
+
+    started = time.perf_counter()
+    timeline = build_timeline(args)
+    timeline_seconds = time.perf_counter() - started
+
+    canvas = TimelineCanvas(*_timeline_layers(args, timeline))
+    total_frames = int(canvas.duration * args.fps)
+    indices = np.linspace(0, total_frames - 1, case["samples"]).astype(int)
+    canvas.render(0)  # opens the intro reader
+    frame_times = []
+    for index in indices:
+        started = time.perf_counter()
+        canvas.render(index / args.fps)
+        frame_times.append((time.perf_counter() - started) * 1000)
+
+    track = CaptionTrack(args.subtitles, canvas.duration)
+    frame = np.zeros((height, width, 3), np.uint8)
+    caption_times = []
+    for start, end in track.times:
+        started = time.perf_counter()
+        track.draw(frame, (start + end) / 2)
+        caption_times.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    stats = render(args)
+    render_seconds = time.perf_counter() - started
+
+    return {
+        "size": name,
+        "duration": case["duration"],
+        "engine": case["engine"],
+        "frames": total_frames,
+        "timeline_seconds": round(timeline_seconds, 3),
+        "frame_ms": round(float(np.mean(frame_times)), 2),
+        "frame_ms_max": round(float(np.max(frame_times)), 2),
+        "caption_ms": round(float(np.mean(caption_times)), 3),
+        "render_seconds": round(render_seconds, 3),
+        "encode_fps": stats["fps"],
+        "peak_rss_mb": peak_rss_mb(),
+        "ffmpeg_peak_rss_mb": peak_rss_mb(children=True),
+        "output_bytes": os.path.getsize(output),
+    }
+
+
+def spawn_case(case):
+    """Run ``case`` in a fresh interpreter; its progress output goes to stderr."""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def compare(cases, baseline):
+    """Add each metric's relative change against the matching baseline case."""
+    previous = {
+        (c["size"], c["duration"], c["engine"]): c for c in baseline["cases"]
+    }
+    for case in cases:
+        old = previous.get((case["size"], case["duration"], case["engine"]))
+        if old is None:
+            continue
+        case["change"] = {
+            metric: round(case[metric] / old[metric] - 1, 4)
+            for metric in METRICS
+            if case.get(metric) and old.get(metric)
+        }
+
+
+# ────────────────────────────── CLI ──────────────────────────────
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the video render pipeline on synthetic inputs"
+    )
+    parser.add_argument(
+        "--sizes",
+        default="480x854,900x1600,1080x1920",
+        help="comma-separated output resolutions",
+    )
+    parser.add_argument(
+        "--durations",
+        default="15,45",
+        help="comma-separated voice-over lengths in seconds",
+    )
+    parser.add_argument(
+        "--engines",
+        default="numpy,moviepy",
+        help="comma-separated engines (numpy-low-memory: numpy with --low-memory)",
+    )
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--profile", default="draft", help="encoder profile")
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=12,
+        help="frames timed individually per case",
+    )
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument(
+        "--baseline", help="earlier benchmark JSON to report changes against"
+    )
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_case:
+        with redirect_stdout(sys.stderr):
+            result = run_case(json.loads(args.run_case))
+        print(json.dumps(result))
+        return
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    durations = [float(duration) for duration in args.durations.split(",")]
+    engines = args.engines.split(",")
+
+    workdir = tempfile.mkdtemp(prefix="video-gen-bench-")
+    try:
+        inputs = make_inputs(workdir, sizes, durations)
+        cases = []
+        for size in sizes:
+            for duration in durations:
+                for engine in engines:
+                    print(
+                        "Benchmarking %dx%d, %g s, %s engine"
+                        % (size + (duration, engine)),
+                        file=sys.stderr,
+                    )
+                    case = dict(
+                        size=size,
+                        duration=duration,
+                        engine=engine,
+                        fps=args.fps,
+                        profile=args.profile,
+                        samples=args.samples,
+                        inputs=inputs,
+                        workdir=workdir,
+                    )
+                    cases.append(spawn_case(case))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fps": args.fps,
+            "profile": args.profile,
+        },
+        "cases": cases,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(cases, json.load(f))
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Low-level NumPy compositing shared by the frame renderers and overlays.
+"""
+import numpy as np
+
+
+def to_alpha(mask):
+    """Float 0-1 mask -> uint16 0-255 alpha with a trailing channel axis."""
+    return (mask * 255).astype(np.uint8).astype(np.uint16)[:, :, None]
+
+
+def blend_into(dst, src, alpha, x, y):
+    """
+    Blend ``src`` onto ``dst`` with its top-left corner at (x, y), clipped to
+    ``dst``. ``alpha`` is a uint16 HxWx1 array from ``to_alpha`` or None for
+    an opaque paste.
+    """
+    h, w = src.shape[:2]
+    dh, dw = dst.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, dw), min(y + h, dh)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = src[y0 - y : y1 - y, x0 - x : x1 - x]
+    region = dst[y0:y1, x0:x1]
+    if alpha is None:
+        region[...] = src
+        return
+
+    a = alpha[y0 - y : y1 - y, x0 - x : x1 - x]
+    mixed = src * a + region * (255 - a) + 127
+    region[...] = mixed // 255
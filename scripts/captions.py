@@ -0,0 +1,177 @@
+"""
+Subtitle captions rendered once per cue instead of once per frame.
+
+``SubtitlesClip`` rebuilds the caption composite (text over a rounded box)
+on every frame it is shown. Here each SRT cue is rasterized up front into an
+RGB sprite plus alpha, memoized by text and style, and a frame only costs one
+alpha blend of the active cue's sprite.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from moviepy import ImageClip, TextClip, VideoClip
+from moviepy.tools import compute_position
+from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+from moviepy.video.tools.subtitles import file_to_subtitles
+
+from scripts.blit import blend_into, to_alpha
+
+CAPTION_STYLE = dict(
+    font_size=46,
+    color="white",
+    stroke_color="black",
+    stroke_width=1,
+    width=780,
+    interline=-3,
+    corner_radius=20,
+    padding=20,
+    background=(0, 0, 0, 200),  # Semi-transparent black (200/255 opacity)
+)
+
+# Rendered caption sprites kept in memory, shared by every track
+MEMO_SIZE = 256
+
+_sprites = OrderedDict()
+
+
+def fit_style(width, style=CAPTION_STYLE):
+    """``style`` scaled down, if its captions can be wider than ``width``."""
+    scale = width / (style["width"] + 2 * style["padding"])
+    if scale >= 1:
+        return style
+    fitted = dict(style)
+    for key in ("font_size", "width", "interline", "corner_radius", "padding"):
+        fitted[key] = int(round(style[key] * scale))
+    return fitted
+
+
+def make_caption_clip(text, style=CAPTION_STYLE):
+    """Caption text centered over a rounded semi-transparent box."""
+    # Create the text without background first
+    text_clip = TextClip(
+        text=text,
+        font_size=style["font_size"],
+        color=style["color"],
+        stroke_color=style["stroke_color"],
+        stroke_width=style["stroke_width"],
+        method="caption",
+        text_align="center",
+        size=(style["width"], None),
+        interline=style["interline"],
+    )
+
+    # Rounded rectangle background using PIL
+    w, h = text_clip.size
+    bg_width = w + (style["padding"] * 2)
+    bg_height = h + (style["padding"] * 2)
+
+    img = Image.new("RGBA", (bg_width, bg_height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rounded_rectangle(
+        [(0, 0), (bg_width - 1, bg_height - 1)],
+        radius=style["corner_radius"],
+        fill=tuple(style["background"]),
+    )
+    bg_clip = ImageClip(np.array(img))
+
+    # Composite text over rounded background
+    return CompositeVideoClip(
+        [bg_clip, text_clip.with_position("center")], size=(bg_width, bg_height)
+    )
+
+
+def caption_sprite(text, style=CAPTION_STYLE):
+    """
+    ``(rgb, mask)`` of a caption: a uint8 frame and its float 0-1 mask,
+    rendered once per text and style.
+    """
+    key = (text, tuple(sorted(style.items())))
+    if key in _sprites:
+        _sprites.move_to_end(key)
+        return _sprites[key]
+    clip = make_caption_clip(text, style)
+    sprite = (clip.get_frame(0).astype(np.uint8), clip.mask.get_frame(0))
+    _sprites[key] = sprite
+    while len(_sprites) > MEMO_SIZE:
+        _sprites.popitem(last=False)
+    return sprite
+
+
+class CaptionTrack:
+    """
+    The cues of an SRT file (or a ``[((start, end), text), ...]`` list) as
+    pre-rendered sprites, shown at ``position`` on the frame. Like
+    ``SubtitlesClip``, the first listed cue covering ``t`` is shown.
+    """
+
+    def __init__(self, subtitles, duration, style=CAPTION_STYLE, position="center"):
+        if isinstance(subtitles, str):
+            subtitles = file_to_subtitles(subtitles)
+        self.cues = subtitles
+        self.duration = duration
+        self.position = position
+        self.starts = np.array([start for (start, _), _ in subtitles], float)
+        self.ends = np.array([end for (_, end), _ in subtitles], float)
+        self.sprites = []
+        for _, text in subtitles:
+            rgb, mask = caption_sprite(text, style)
+            self.sprites.append((rgb, mask, to_alpha(mask)))
+
+    @property
+    def times(self):
+        return [times for times, _ in self.cues]
+
+    def active(self, t):
+        """Index of the cue shown at ``t``, or None."""
+        hits = np.flatnonzero((self.starts <= t) & (t < self.ends))
+        return int(hits[0]) if len(hits) and t < self.duration else None
+
+    def frame_state(self, t):
+        return self.active(t)
+
+    def draw(self, dst, t):
+        """Blend the caption shown at ``t`` onto the frame ``dst``."""
+        i = self.active(t)
+        if i is None:
+            return
+        rgb, _, alpha = self.sprites[i]
+        x, y = compute_position(rgb.shape[1::-1], dst.shape[1::-1], self.position)
+        blend_into(dst, rgb, alpha, x, y)
+
+    def to_clip(self):
+        """The track as a masked clip, for compositing with MoviePy."""
+        blank_frame, blank_mask = np.zeros((1, 1, 3)), np.zeros((1, 1))
+
+        def frame_function(t):
+            i = self.active(t)
+            return blank_frame if i is None else self.sprites[i][0]
+
+        def mask_function(t):
+            i = self.active(t)
+            return blank_mask if i is None else self.sprites[i][1]
+
+        mask = VideoClip(mask_function, is_mask=True, duration=self.duration)
+        clip = VideoClip(frame_function, duration=self.duration).with_mask(mask)
+        return clip.with_position(self.position)
+
+
+def _vtt_time(seconds):
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    return "%02d:%02d:%06.3f" % (hours, minutes, ms / 1000)
+
+
+def write_webvtt(subtitles, path):
+    """
+    Write the cues of an SRT file (or a cue list, as for ``CaptionTrack``)
+    as a WebVTT file, the sidecar format of HTML5 ``<track>`` elements.
+    """
+    if isinstance(subtitles, str):
+        subtitles = file_to_subtitles(subtitles)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n")
+        for (start, end), text in subtitles:
+            f.write("\n%s --> %s\n%s\n" % (_vtt_time(start), _vtt_time(end), text))
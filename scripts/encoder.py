@@ -0,0 +1,356 @@
+"""
+ffmpeg encoder fed raw RGB frames on stdin.
+
+Builds the same command line as MoviePy's ``FFMPEG_VideoWriter`` but can also
+take the soundtrack as an ``AudioMix`` streamed on a second pipe, so the
+mixed audio is muxed while the frames are encoded, without a temp file.
+
+Frames always leave Python as packed ``rgb24``; the conversion to the
+output pixel format is done by ffmpeg (``-pix_fmt``). A frame held on screen
+for several frames is sent once with its repeat count (``holds``): ffmpeg
+either duplicates it before x264 (constant frame rate, the same stream as
+if every copy was sent) or, with ``vfr``, stores it once as a long frame.
+
+The same ffmpeg process can also split the frames into ``extra_outputs``
+(other encodes, a still, an animated GIF/WebP; see ``video_output`` and
+friends), so every deliverable cut from one picture is made in one pass.
+"""
+import queue
+import subprocess
+import threading
+import time
+
+from moviepy.config import FFMPEG_BINARY
+
+from scripts.audio_mix import AudioFeed
+
+# Named x264 settings, from fastest/smallest to best quality. ``draft`` is
+# what every video used to be encoded with.
+PROFILES = {
+    "draft": dict(
+        preset="ultrafast",
+        audio_codec="aac",
+        bitrate="1000k",  # Very low bitrate
+        threads=0,
+        ffmpeg_params=[
+            "-crf",
+            "35",  # Much higher CRF
+            "-g",
+            "60",  # Larger GOP size
+            "-bf",
+            "0",  # No B-frames
+            "-refs",
+            "1",  # Single reference frame
+            "-me_method",
+            "dia",  # Diamond motion estimation (fastest)
+            "-subq",
+            "1",  # Lowest subpixel refinement
+            "-trellis",
+            "0",  # Disable trellis quantization
+        ],
+    ),
+    "social": dict(
+        preset="veryfast",
+        audio_codec="aac",
+        threads=0,
+        ffmpeg_params=[
+            "-crf",
+            "23",
+            "-maxrate",
+            "4000k",  # Stay inside upload limits of social platforms
+            "-bufsize",
+            "8000k",
+            "-g",
+            "60",
+            "-b:a",
+            "128k",
+        ],
+    ),
+    "archive": dict(
+        preset="slow",
+        audio_codec="aac",
+        threads=0,
+        ffmpeg_params=["-crf", "17", "-g", "120", "-b:a", "192k"],
+    ),
+}
+DEFAULT_PROFILE = "draft"
+
+
+def profile_params(name, pix_fmt=None):
+    """Encoder keyword arguments of the profile ``name`` (a fresh copy)."""
+    if name not in PROFILES:
+        raise ValueError(
+            "unknown encoder profile %r (choose from %s)"
+            % (name, ", ".join(sorted(PROFILES)))
+        )
+    params = dict(PROFILES[name], codec="libx264")
+    params["ffmpeg_params"] = list(params["ffmpeg_params"])
+    params["ffmpeg_params"] += ["-movflags", "+faststart"]
+    if pix_fmt is not None:
+        params["pix_fmt"] = pix_fmt
+    return params
+
+
+def hold_filter(holds, fps, vfr=False):
+    """
+    The ffmpeg filter timing the frames sent for ``holds``, a mapping of
+    frame index (among the frames sent) to the number of times it repeats:
+    every later frame is pushed back by the repeats, and, unless ``vfr``,
+    the ``fps`` filter fills the gaps with copies of the held frames.
+    """
+    graph = hold_timing(holds)
+    return graph if vfr else graph + ",fps=%.02f" % fps
+
+
+def hold_timing(holds):
+    """The ``setpts`` filter of ``hold_filter``, without the gaps filled."""
+    steps = "".join(
+        "+%d*gte(N,%d)" % (repeats, index + 1)
+        for index, repeats in sorted(holds.items())
+    )
+    return "setpts='(N%s)/FRAME_RATE/TB'" % steps
+
+
+def video_args(
+    size,
+    codec="libx264",
+    preset="medium",
+    bitrate=None,
+    threads=None,
+    ffmpeg_params=None,
+    pix_fmt=None,
+):
+    """ffmpeg output options encoding frames of ``size`` with ``codec``."""
+    args = ["-vcodec", codec, "-preset", preset]
+    args += ffmpeg_params or []
+    if bitrate is not None:
+        args += ["-b", bitrate]
+    if threads is not None:
+        args += ["-threads", str(threads)]
+    if pix_fmt is not None:
+        args += ["-pix_fmt", pix_fmt]
+    elif codec == "libx264" and size[0] % 2 == 0 and size[1] % 2 == 0:
+        args += ["-pix_fmt", "yuv420p"]
+    return args
+
+
+def video_output(filename, size=None, audio_codec="aac", **params):
+    """
+    An entry of ``FrameEncoder``'s ``extra_outputs``: the frames encoded
+    again with the encoder ``params`` (e.g. another profile's), scaled to
+    ``size`` if given, with the soundtrack.
+    """
+    return dict(
+        filename=filename,
+        filter="scale=%d:%d" % size if size else None,
+        size=size,
+        video=params,
+        args=["-acodec", audio_codec],
+        audio=True,
+    )
+
+
+def still_output(filename, index):
+    """An ``extra_outputs`` entry saving frame ``index`` as an image."""
+    return dict(
+        filename=filename,
+        filter="trim=start_frame=%d:end_frame=%d" % (index, index + 1),
+        args=["-frames:v", "1", "-update", "1", "-q:v", "2"],
+    )
+
+
+def animation_output(filename, first, stop, fps, width):
+    """
+    An ``extra_outputs`` entry saving frames ``first:stop`` as a looping
+    animation, resampled to ``fps`` and scaled to ``width``: an animated
+    WebP if ``filename`` ends in .webp, else a GIF (with a palette made
+    from its own frames).
+    """
+    chain = "trim=start_frame=%d:end_frame=%d,setpts=PTS-STARTPTS" % (first, stop)
+    chain += ",fps=%s,scale=%d:-2:flags=lanczos" % (fps, width)
+    webp = filename.lower().endswith(".webp")
+    return dict(
+        filename=filename,
+        filter=chain,
+        args=(["-vcodec", "libwebp_anim"] if webp else []) + ["-loop", "0"],
+        palette=not webp,
+    )
+
+
+def split_graph(holds, fps, vfr, outputs):
+    """
+    The ``-filter_complex`` of a ``FrameEncoder`` with extra ``outputs``:
+    the frames (timed for ``holds``) are split into ``[o0]`` for the main
+    output, timed like with ``-vf hold_filter``, and ``[o1]``... through
+    the filter of each extra output, which always sees every frame at
+    ``fps`` (the gaps of holds filled, whatever ``vfr``).
+    """
+    labels = "".join("[s%d]" % i for i in range(len(outputs) + 1))
+    head = hold_timing(holds) + "," if holds else ""
+    chains = ["[0:v]%ssplit=%d%s" % (head, len(outputs) + 1, labels)]
+    refill = "fps=%.02f" % fps if holds else None
+    chains.append("[s0]%s[o0]" % (refill if refill and not vfr else "null"))
+    for i, output in enumerate(outputs, 1):
+        filters = [f for f in (refill, output.get("filter")) if f]
+        chain = "[s%d]%s" % (i, ",".join(filters) or "null")
+        if output.get("palette"):
+            chain += ",split[a%d][b%d];[a%d]palettegen[p%d];[b%d][p%d]paletteuse" % (
+                (i,) * 6
+            )
+        chains.append(chain + "[o%d]" % i)
+    return ";".join(chains)
+
+
+class FrameEncoder:
+    """
+    ``holds`` maps the index of a frame (counting the frames written) to the
+    number of times it is shown again after itself; those copies are not
+    written (see ``hold_filter``). With ``vfr`` they are not encoded either:
+    the frame is kept once, with a longer duration.
+
+    ``extra_outputs`` (from ``video_output``, ``still_output`` and
+    ``animation_output``) are written by the same ffmpeg process, from the
+    same frames (see ``split_graph``); ``vfr`` applies to ``filename`` only.
+
+    With ``queue_size`` > 0, frames are handed to a writer thread through a
+    bounded queue, so the next frames are composed while ffmpeg drains the
+    pipe; otherwise ``write_frame`` blocks until ffmpeg has read the frame.
+    """
+
+    def __init__(
+        self,
+        filename,
+        size,
+        fps,
+        codec="libx264",
+        audio=None,
+        audio_codec="aac",
+        preset="medium",
+        bitrate=None,
+        threads=None,
+        ffmpeg_params=None,
+        pix_fmt=None,
+        queue_size=0,
+        holds=None,
+        vfr=False,
+        extra_outputs=None,
+    ):
+        self.filename = filename
+        cmd = [FFMPEG_BINARY, "-y", "-loglevel", "error"]
+        cmd += ["-f", "rawvideo", "-vcodec", "rawvideo"]
+        cmd += ["-s", "%dx%d" % size, "-pix_fmt", "rgb24", "-r", "%.02f" % fps]
+        cmd += ["-an", "-i", "-"]
+
+        self.audio_feed = None
+        pass_fds = ()
+        if audio is not None:
+            self.audio_feed = AudioFeed(audio)
+            cmd += self.audio_feed.input_args + ["-acodec", audio_codec]
+            pass_fds = self.audio_feed.pass_fds
+
+        self.holds = dict(holds or {})
+        extra_outputs = list(extra_outputs or ())
+        if extra_outputs:
+            graph = split_graph(self.holds, fps, vfr, extra_outputs)
+            cmd += ["-filter_complex", graph, "-map", "[o0]"]
+            if audio is not None:
+                cmd += ["-map", "1:a"]
+        elif self.holds:
+            cmd += ["-vf", hold_filter(self.holds, fps, vfr)]
+        if vfr:
+            cmd += ["-fps_mode", "vfr"]
+
+        cmd += video_args(size, codec, preset, bitrate, threads, ffmpeg_params, pix_fmt)
+        cmd.append(filename)
+        for i, output in enumerate(extra_outputs, 1):
+            cmd += ["-map", "[o%d]" % i]
+            if output.get("audio") and audio is not None:
+                cmd += ["-map", "1:a"]
+            if output.get("video") is not None:
+                cmd += video_args(output.get("size") or size, **output["video"])
+            cmd += output.get("args", []) + [output["filename"]]
+
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            pass_fds=pass_fds,
+        )
+        if self.audio_feed is not None:
+            self.audio_feed.start()
+
+        self.frames = 0  # including the repeats of held frames
+        self.written = 0
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.queue = self.thread = None
+        self.broken = False
+        if queue_size > 0:
+            self.queue = queue.Queue(queue_size)
+            self.thread = threading.Thread(target=self._drain, daemon=True)
+            self.thread.start()
+
+    def _drain(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            if self.broken:
+                continue  # keep emptying the queue so the producer never blocks
+            try:
+                self.proc.stdin.write(data)
+            except IOError:
+                self.broken = True
+
+    def write_frame(self, frame):
+        self.frames += 1 + self.holds.get(self.written, 0)
+        self.written += 1
+        if self.queue is not None:
+            if self.broken:
+                self.close()  # raises with ffmpeg's error output
+            self.queue.put(frame.tobytes())
+            return
+        try:
+            self.proc.stdin.write(frame.tobytes())
+        except IOError:
+            self.close()  # raises with ffmpeg's error output
+
+    @property
+    def fps(self):
+        """Frames encoded per second of wall time, so far or in total."""
+        seconds = self.seconds or time.perf_counter() - self.started
+        return self.frames / seconds if seconds else 0.0
+
+    def close(self):
+        if self.proc is None:
+            return
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        proc, self.proc = self.proc, None
+        try:
+            proc.stdin.close()
+        except IOError:
+            pass
+        if self.audio_feed is not None:
+            self.audio_feed.join()
+        error = proc.stderr.read().decode(errors="replace")
+        proc.stderr.close()
+        self.seconds = time.perf_counter() - self.started
+        if proc.wait():
+            raise IOError("ffmpeg failed to write %s:\n%s" % (self.filename, error))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.proc is not None:
+            self.proc.kill()
+            try:
+                self.close()
+            except IOError:
+                pass
@@ -1,168 +1,123 @@
-import math
-import os
 from PIL import Image, ImageDraw
 import numpy as np
 
 from moviepy import (
-    AudioFileClip,
     ColorClip,
     CompositeAudioClip,
     CompositeVideoClip,
     ImageClip,
-    afx,
-    TextClip,
+    VideoClip,
 )
-from moviepy.video.fx import Resize, FadeIn, FadeOut
+from moviepy.video.fx import FadeIn, FadeOut
+from moviepy.tools import compute_position
 
+from scripts.assets import load_audio
+from scripts.blit import blend_into, to_alpha
+from scripts.intervals import IntervalIndex
+from scripts.transitions import SlideTrack, ease, slide_from_clip
+from scripts.templates import DEFAULT_LAYOUT, build_layers, load_template
 
-def create_image_grid(images_list, video_width, video_height, duration):
+
+def _clip_box(clip, frame_size, duration):
     """
-    Create the exact Decory app layout:
-    - 1 large image at the top (main image)
-    - 4 smaller images in a 2x2 grid below
-    - Exactly 5 images total
+    Return the (x0, y0, x1, y1) box a clip paints into, or None when the
+    position moves over time (sampled at start, middle and end).
     """
+    samples = [clip.pos(t) for t in (0, duration / 2, duration)]
+    if any(s != samples[0] for s in samples[1:]):
+        return None
+    x, y = compute_position(clip.size, frame_size, samples[0], clip.relative_pos)
+    return (x, y, x + clip.size[0], y + clip.size[1])
 
-    if len(images_list) != 5:
-        raise ValueError("This layout requires exactly 5 images")
-
-    # Colors matching the Decory app
-    bg_color = (248, 226, 226)  # Soft pink background
-    card_color = (255, 255, 255)  # White cards
-
-    # Create background
-    bg = ColorClip(size=(video_width, video_height), color=bg_color).with_duration(
-        duration
-    )
-
-    # Layout parameters
-    padding = int(min(video_width, video_height) * 0.04)  # 4% padding from edges
-    card_margin = int(min(video_width, video_height) * 0.02)  # 2% margin between cards
-
-    # Calculate dimensions
-    # Main image (top) - takes about 50% of height
-    main_card_width = video_width - (padding * 2)
-    main_card_height = int(video_height * 0.45)  # 45% of total height
-
-    # Small images (bottom 2x2 grid) - remaining space
-    remaining_height = video_height - main_card_height - (padding * 3) - card_margin
-    small_card_height = remaining_height // 2
-    small_card_width = (main_card_width - card_margin) // 2
-
-    clips = [bg]
-
-    # 1. Main image (top, large)
-    main_x = padding
-    main_y = padding
-
-    # Main card background with shadow
-    main_shadow = (
-        ColorClip(size=(main_card_width, main_card_height), color=(200, 200, 200))
-        .with_position((main_x + 6, main_y + 6))
-        .with_duration(duration)
-        .with_opacity(0.3)
-    )
-
-    main_card_bg = (
-        ColorClip(size=(main_card_width, main_card_height), color=card_color)
-        .with_position((main_x, main_y))
-        .with_duration(duration)
-    )
-
-    # Main image
-    try:
-        main_img = ImageClip(images_list[0])
-
-        # Scale to fit main card with padding
-        img_padding = 15
-        target_width = main_card_width - (img_padding * 2)
-        target_height = main_card_height - (img_padding * 2)
-
-        # Calculate scale to fit
-        img_w, img_h = main_img.size
-        scale_w = target_width / img_w
-        scale_h = target_height / img_h
-        scale = min(scale_w, scale_h)
-
-        main_img = main_img.Resized(scale)
-
-        # Center the image
-        img_x = main_x + (main_card_width - main_img.size[0]) // 2
-        img_y = main_y + (main_card_height - main_img.size[1]) // 2
-
-        main_img = main_img.with_position((img_x, img_y)).with_duration(duration)
-
-        clips.extend([main_shadow, main_card_bg, main_img])
-
-    except Exception as e:
-        print(f"Error processing main image: {e}")
-        clips.extend([main_shadow, main_card_bg])
-
-    # 2. Four small images in 2x2 grid
-    grid_start_y = main_y + main_card_height + card_margin
 
-    # Positions for 2x2 grid
-    positions = [
-        (0, 0),  # Top-left
-        (1, 0),  # Top-right
-        (0, 1),  # Bottom-left
-        (1, 1),  # Bottom-right
-    ]
+def _boxes_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
 
-    for i, (col, row) in enumerate(positions):
-        if i + 1 >= len(images_list):  # Skip if we don't have enough images
-            break
 
-        # Calculate position
-        small_x = padding + col * (small_card_width + card_margin)
-        small_y = grid_start_y + row * (small_card_height + card_margin)
+def is_time_invariant(clip, duration):
+    """
+    True when a clip shows the same pixels at the same place for the whole
+    of ``duration``: a ColorClip/ImageClip/TextClip with a static mask, no
+    time-dependent effect (those turn it into a plain VideoClip), a fixed
+    position and a lifetime covering the full composite.
+    """
+    if not isinstance(clip, ImageClip):
+        return False
+    if clip.mask is not None and not isinstance(clip.mask, ImageClip):
+        return False
+    if clip.start != 0 or (clip.end is not None and clip.end < duration):
+        return False
+    return _clip_box(clip, clip.size, duration) is not None
 
-        # Small card shadow
-        small_shadow = (
-            ColorClip(size=(small_card_width, small_card_height), color=(200, 200, 200))
-            .with_position((small_x + 4, small_y + 4))
-            .with_duration(duration)
-            .with_opacity(0.3)
-        )
 
-        # Small card background
-        small_card_bg = (
-            ColorClip(size=(small_card_width, small_card_height), color=card_color)
-            .with_position((small_x, small_y))
-            .with_duration(duration)
-        )
+def flatten_static_clips(clips, size, duration):
+    """
+    Composite every time-invariant clip once into a single background
+    ImageClip and return ``[background] + remaining clips``.
 
-        # Small image
-        try:
-            small_img = ImageClip(
-                images_list[i + 1]
-            )  # +1 because index 0 is the main image
+    A static clip is only hoisted into the background when it does not
+    overlap any dynamic clip stacked beneath it, so the layer order of the
+    result is identical to the original composite. Dynamic clips whose
+    position moves are assumed to cover the whole frame.
+    """
+    ordered = sorted(clips, key=lambda c: c.layer_index)
+    static, remaining, dynamic_boxes = [], [], []
+    full_frame = (0, 0, size[0], size[1])
+
+    for clip in ordered:
+        if is_time_invariant(clip, duration):
+            box = _clip_box(clip, size, duration)
+            if not any(_boxes_overlap(box, d) for d in dynamic_boxes):
+                static.append(clip)
+                continue
+        remaining.append(clip)
+        box = _clip_box(clip, size, duration) if clip.size else None
+        dynamic_boxes.append(box or full_frame)
 
-            # Scale to fit small card
-            img_padding = 10
-            target_width = small_card_width - (img_padding * 2)
-            target_height = small_card_height - (img_padding * 2)
+    if not static:
+        return list(clips)
 
-            img_w, img_h = small_img.size
-            scale_w = target_width / img_w
-            scale_h = target_height / img_h
-            scale = min(scale_w, scale_h)
+    flat = CompositeVideoClip(static, size=size)
+    background = ImageClip(flat.get_frame(0)).with_duration(duration)
+    alpha = flat.mask.get_frame(0)
+    if alpha.min() < 1.0:
+        background = background.with_mask(ImageClip(alpha, is_mask=True))
+    return [background] + remaining
 
-            small_img = small_img.Resized(scale)
 
-            # Center the image
-            img_x = small_x + (small_card_width - small_img.size[0]) // 2
-            img_y = small_y + (small_card_height - small_img.size[1]) // 2
+class IndexedCompositeVideoClip(CompositeVideoClip):
+    """
+    A CompositeVideoClip that finds the clips playing at ``t`` through an
+    ``IntervalIndex`` built once from their start and end times, instead of
+    asking every clip on every frame, so the cost of a frame depends on the
+    clips live at ``t`` rather than on the length of the whole list (slides
+    and cursor clips grow with the voice-over). Its mask is indexed too.
+    """
 
-            small_img = small_img.with_position((img_x, img_y)).with_duration(duration)
+    def __init__(self, clips, *args, **kwargs):
+        super().__init__(clips, *args, **kwargs)
+        self.index = IntervalIndex((clip.start, clip.end) for clip in self.clips)
+        if isinstance(self.mask, CompositeVideoClip):
+            self.mask = IndexedCompositeVideoClip(
+                self.mask.clips, self.size, is_mask=True, bg_color=0.0
+            )
 
-            clips.extend([small_shadow, small_card_bg, small_img])
+    def playing_clips(self, t=0):
+        if isinstance(t, np.ndarray):
+            return super().playing_clips(t)
+        return [self.clips[i] for i in self.index.live(t)]
 
-        except Exception as e:
-            print(f"Error processing small image {i+1}: {e}")
-            clips.extend([small_shadow, small_card_bg])
 
-    return CompositeVideoClip(clips)
+def create_image_grid(images_list, video_width, video_height, duration):
+    """
+    Create the exact Decory app layout:
+    - 1 large image at the top (main image)
+    - 4 smaller images in a 2x2 grid below
+    - Exactly 5 images total
+    """
+    return create_layout_slideshow(
+        [], images_list, None, video_width, video_height, duration, layout="image_grid"
+    )
 
 
 def create_decory_slideshow_with_crossfade(
@@ -188,217 +143,21 @@ def create_decory_slideshow_with_crossfade(
         slide_duration: How long each slide is visible
         crossfade_duration: Duration of crossfade between slides
     """
-
-    if len(static_images) != 4 or len(labels_list) != 4:
-        raise ValueError("Need exactly 4 static images and 4 labels")
-
-    # Colors and layout (same as above)
-    bg_color = (248, 226, 226)
-    card_color = (255, 255, 255)
-    text_color = "black"
-
-    bg = ColorClip(size=(video_width, video_height), color=bg_color).with_duration(
-        total_duration
-    )
-
-    padding = int(min(video_width, video_height) * 0.04)
-    card_margin = int(min(video_width, video_height) * 0.02)
-    label_height = 30
-
-    main_card_width = video_width - (padding * 2)
-    main_card_height = int(video_height * 0.4)
-
-    remaining_height = video_height - main_card_height - (padding * 3) - card_margin
-    small_card_height = (remaining_height - label_height) // 2
-    small_card_width = (main_card_width - card_margin) // 2
-
-    main_x = padding
-    main_y = padding
-
-    # Main card background
-    main_shadow = (
-        ColorClip(size=(main_card_width, main_card_height), color=(200, 200, 200))
-        .with_position((main_x + 6, main_y + 6))
-        .with_duration(total_duration)
-        .with_opacity(0.3)
-    )
-
-    main_card_bg = (
-        ColorClip(size=(main_card_width, main_card_height), color=card_color)
-        .with_position((main_x, main_y))
-        .with_duration(total_duration)
+    return create_layout_slideshow(
+        slideshow_images,
+        static_images,
+        labels_list,
+        video_width,
+        video_height,
+        total_duration,
+        transition_duration=crossfade_duration,
+        layout="decory_crossfade",
+        slideshow=dict(slide_duration=slide_duration, overlap=crossfade_duration),
     )
 
-    # Create slideshow with crossfade
-    slideshow_clips = []
-    if slideshow_images:
-        img_padding = 20
-        target_width = main_card_width - (img_padding * 2)
-        target_height = main_card_height - (img_padding * 2)
-
-        # Calculate how many full cycles we can fit
-        cycle_duration = len(slideshow_images) * slide_duration
-        num_cycles = max(1, int(total_duration / cycle_duration))
-
-        for cycle in range(num_cycles):
-            cycle_start = cycle * cycle_duration
-
-            for i, img_path in enumerate(slideshow_images):
-                try:
-                    # Check if image exists
-                    if not os.path.exists(img_path):
-                        print(f"Image file not found: {img_path}")
-                        continue
-
-                    slide_img = ImageClip(img_path)
-
-                    # Validate image
-                    if slide_img.size == (0, 0):
-                        print(f"Invalid image: {img_path}")
-                        continue
-
-                    # Scale to fit
-                    img_w, img_h = slide_img.size
-                    scale = min(target_width / img_w, target_height / img_h)
-                    slide_img = slide_img.Resized(
-                        (int(img_w * scale), int(img_h * scale))
-                    )
-
-                    # Center position
-                    img_x = main_x + (main_card_width - slide_img.size[0]) // 2
-                    img_y = main_y + (main_card_height - slide_img.size[1]) // 2
-
-                    # Timing
-                    start_time = cycle_start + i * slide_duration
-                    clip_duration = min(
-                        slide_duration + crossfade_duration, total_duration - start_time
-                    )
-
-                    if start_time >= total_duration:
-                        break
-
-                    # Set proper duration and timing
-                    slide_img = (
-                        slide_img.with_position((img_x, img_y))
-                        .with_duration(clip_duration)
-                        .with_start(start_time)
-                    )
-
-                    # Apply crossfade
-                    if i == 0 and cycle == 0:
-                        # First image ever: just fade in
-                        slide_img = FadeIn(crossfade_duration).apply(slide_img)
-
-                    elif start_time + slide_duration >= total_duration:
-                        # Last image: fade out
-                        slide_img = FadeOut(crossfade_duration).apply(slide_img)
-                    else:
-                        # Regular crossfade
-                        slide_img = FadeIn(crossfade_duration).apply(slide_img)
-                        slide_img = FadeOut(crossfade_duration).apply(slide_img)
-
-                    slideshow_clips.append(slide_img)
-
-                except Exception as e:
-                    print(
-                        f"Error processing slideshow image {i} in cycle {cycle} ({img_path}): {e}"
-                    )
-                    continue
-
-    # Debug print
-    print(f"Created {len(slideshow_clips)} slideshow clips with crossfade")
-
-    # Static bottom grid (same as previous function)
-    static_clips = []
-    grid_start_y = main_y + main_card_height + card_margin
-    positions = [(0, 0), (1, 0), (0, 1), (1, 1)]
-
-    for i, (col, row) in enumerate(positions):
-        small_x = padding + col * (small_card_width + card_margin)
-        small_y = grid_start_y + row * (small_card_height + card_margin + label_height)
-
-        small_shadow = (
-            ColorClip(size=(small_card_width, small_card_height), color=(200, 200, 200))
-            .with_position((small_x + 4, small_y + 4))
-            .with_duration(total_duration)
-            .with_opacity(0.3)
-        )
-
-        small_card_bg = (
-            ColorClip(size=(small_card_width, small_card_height), color=card_color)
-            .with_position((small_x, small_y))
-            .with_duration(total_duration)
-        )
-
-        try:
-            if not os.path.exists(static_images[i]):
-                print(f"Static image file not found: {static_images[i]}")
-                static_clips.extend([small_shadow, small_card_bg])
-                continue
-
-            static_img = ImageClip(static_images[i], duration=total_duration)
-
-            if static_img.size == (0, 0):
-                print(f"Invalid static image: {static_images[i]}")
-                static_clips.extend([small_shadow, small_card_bg])
-                continue
-
-            img_padding = 10
-            target_width = small_card_width - (img_padding * 2)
-            target_height = small_card_height - (img_padding * 2)
-
-            img_w, img_h = static_img.size
-            scale = min(target_width / img_w, target_height / img_h)
-            static_img = static_img.Resized((int(img_w * scale), int(img_h * scale)))
-
-            img_x = small_x + (small_card_width - static_img.size[0]) // 2
-            img_y = small_y + (small_card_height - static_img.size[1]) // 2
-            static_img = static_img.with_position((img_x, img_y))
-
-            static_clips.extend([small_shadow, small_card_bg, static_img])
-
-        except Exception as e:
-            print(f"Error processing static image {i}: {e}")
-            static_clips.extend([small_shadow, small_card_bg])
-
-        # Label
-        try:
-            text_clip = TextClip(
-                labels_list[i],
-                font_size=min(small_card_width // 10, 16),
-                color=text_color,
-            ).with_duration(total_duration)
-
-            text_x = small_x + (small_card_width - text_clip.size[0]) // 2
-            text_y = small_y + small_card_height + 8
-            text_clip = text_clip.with_position((text_x, text_y))
-            static_clips.append(text_clip)
-
-        except Exception as e:
-            print(f"Error creating label {i}: {e}")
-
-    # Combine all clips
-    all_clips = [bg, main_shadow, main_card_bg] + slideshow_clips + static_clips
-
-    return CompositeVideoClip(all_clips)
-
-
-def ease(t):
-    """Smoothstep easing: ease-in-out"""
-    return 3 * (t**2) - 2 * (t**3)
-
-
-def build_cursor_clips(
-    cursor_icon_path,
-    positions,
-    total_duration,
-    slide_duration,
-    click_sound,
-    cursor_size=(60, 60),
-):
-    cw, ch = cursor_size
-    half_w, half_h = cw // 2, ch // 2
 
+def build_cursor_sprite(cursor_size=(60, 60), duration=None):
+    """White dot cursor with its glow outline, as one composite clip."""
     diameter = min(cursor_size)
 
     # draw with PIL
@@ -406,213 +165,279 @@ def build_cursor_clips(
     draw = ImageDraw.Draw(img)
     draw.ellipse((0, 0, diameter, diameter), fill=(255, 255, 255, 255))
 
-    # Load cursor icon
-    icon = ImageClip(np.array(img)).resized(cursor_size).with_duration(total_duration)
-    # icon = (
-    #     ImageClip(cursor_icon_path).resized(cursor_size).with_duration(total_duration)
-    # )
+    icon = ImageClip(np.array(img)).resized(cursor_size).with_duration(duration)
     # Optional glow outline
     try:
         outline = (
             ColorClip(size=cursor_size, color=(255, 255, 255))
             .resized(1.2)
             .with_opacity(0.2)
-            .with_duration(total_duration)
+            .with_duration(duration)
             .with_mask(icon.mask)
         )
     except Exception:
         outline = icon
 
-    def make_move(prev, curr):
-        def pos(t):
-            t_clamped = max(0, min(t, slide_duration))
-            p = ease(t_clamped / slide_duration)
-            x = prev[0] + (curr[0] - prev[0]) * p
-            y = prev[1] + (curr[1] - prev[1]) * p
-            return x - half_w, y - half_h
-
-        return pos
-
-    video_clips = []
-    audio_clips = []  # Separate list for audio clips
-    # print("Click sound path:", click_sound)
-    # print("File exists?", os.path.exists(click_sound))
-
-    click_audio = (
-        AudioFileClip(click_sound)
-        # .with_effects([afx.MultiplyVolume(2.0)])
-    )
-
-    # print("Click audio loaded?", click_audio is not None)
+    return CompositeVideoClip([outline, icon])
 
-    num = len(positions)
 
-    for i in range(num):
-        start = i * slide_duration
-        prev_pos = positions[(i - 1) % num]
-        curr_pos = positions[i]
+PRESS_DURATION = 0.2
 
-        # Movement clip
-        move = (
-            CompositeVideoClip([outline, icon])
-            .with_start(start)
-            .with_duration(slide_duration)
-            .with_position(make_move(prev_pos, curr_pos))
-        )
-        video_clips.append(move)
-
-        # Click press animation (scale down/up)
-        press = (
-            CompositeVideoClip([outline, icon])
-            .with_start(start)
-            .with_duration(0.2)
-            .resized(lambda t: 1 - 0.1 * ease(t / 0.2))
-            .with_position((curr_pos[0] - half_w, curr_pos[1] - half_h))
-        )
-        if click_audio:
-            # make sure this slice is only 0.2s long
-            press = press.with_audio(click_audio.subclipped(0, 0.2))
-            # print("press", press.audio)
-        video_clips.append(press)
-
-        # Click sound - add to separate audio list
-        if click_audio:
-            audio_clips.append(click_audio.with_start(start))
-
-    return video_clips, audio_clips  # Return both lists separately
 
+class CursorOverlay:
+    """
+    The Decory cursor as one overlay: the sprite glides from grid card to
+    grid card (``positions``, one slot of ``slide_duration`` each) and shrinks
+    briefly at the start of every slot as it clicks.
+
+    Trajectory and press scale are evaluated with NumPy over whole arrays of
+    timestamps. ``precompute`` tabulates them for the frame times a render
+    will request and resamples each distinct pressed size once, so drawing a
+    frame is a table lookup and two blits.
+    """
 
-def create_decory_slideshow(
+    def __init__(self, positions, slide_duration, total_duration, cursor_size=(60, 60)):
+        self.positions = np.array(positions, float)
+        self.slide_duration = slide_duration
+        self.duration = total_duration
+        self.starts = np.arange(len(positions)) * slide_duration
+        self.half = (cursor_size[0] // 2, cursor_size[1] // 2)
+
+        sprite = build_cursor_sprite(cursor_size, total_duration)
+        self.image = sprite.get_frame(0).astype(np.uint8)
+        self.mask = sprite.mask.get_frame(0)
+        self.alpha = to_alpha(self.mask)
+        self._press_sprites = {}
+        self._table = None
+        self._rows = {}
+
+    def evaluate(self, times):
+        """
+        Cursor state at each of ``times``: top-left of the moving sprite
+        (``move``, with ``visible``), and of the pressed sprite (``press``,
+        with its ``press_size``; (0, 0) outside a press).
+        """
+        t = np.asarray(times, float)
+        num = len(self.positions)
+        slot = np.searchsorted(self.starts, t, side="right") - 1
+        start = self.starts[np.maximum(slot, 0)]
+        visible = (slot >= 0) & (t < start + self.slide_duration)
+        ct = t - start
+
+        # Eased glide from the previous card to the current one
+        p = ease(np.clip(ct, 0, self.slide_duration) / self.slide_duration)
+        prev = self.positions[(slot - 1) % num]
+        curr = self.positions[slot % num]
+        move = prev + (curr - prev) * p[:, None] - self.half
+
+        # Press: scale 1 -> 0.9 over PRESS_DURATION, anchored at the card
+        pressed = visible & (t < start + PRESS_DURATION)
+        scale = 1 - 0.1 * ease(np.clip(ct, 0, PRESS_DURATION) / PRESS_DURATION)
+        h, w = self.mask.shape
+        size = np.stack([scale * w, scale * h], axis=1).astype(int)
+
+        return {
+            "visible": visible,
+            "move": move.astype(int),
+            "pressed": pressed,
+            "press": (curr - self.half).astype(int),
+            "press_size": np.where(pressed[:, None], size, 0),
+        }
+
+    def precompute(self, times):
+        """Tabulate the frame times a render will request."""
+        self._table = self.evaluate(times)
+        self._rows = {t: i for i, t in enumerate(times)}
+        for size in np.unique(self._table["press_size"][self._table["pressed"]], axis=0):
+            self._press_sprite(tuple(size))
+
+    def state(self, t):
+        """Where the sprites are drawn at ``t``: equal states, equal pixels."""
+        row = self._rows.get(t)
+        table = self._table
+        if row is None:
+            table, row = self.evaluate([t]), 0
+        move = tuple(table["move"][row]) if table["visible"][row] else None
+        press = None
+        if table["pressed"][row]:
+            press = tuple(table["press"][row]), tuple(table["press_size"][row])
+        return move, press
+
+    def _press_sprite(self, size):
+        """Cursor sprite resized like MoviePy's Resize, cached per pixel size."""
+        size = (int(size[0]), int(size[1]))
+        if size not in self._press_sprites:
+            image = Image.fromarray(self.image).resize(size, Image.Resampling.LANCZOS)
+            mask = Image.fromarray((255 * self.mask).astype(np.uint8)).resize(
+                size, Image.Resampling.LANCZOS
+            )
+            mask = np.array(mask)
+            self._press_sprites[size] = (
+                np.array(image),
+                mask / 255.0,
+                mask.astype(np.uint16)[:, :, None],
+            )
+        return self._press_sprites[size]
+
+    def draw(self, dst, t):
+        """Blend the cursor at time ``t`` onto the frame ``dst``."""
+        move, press = self.state(t)
+        if move is not None:
+            blend_into(dst, self.image, self.alpha, int(move[0]), int(move[1]))
+        if press is not None:
+            image, _, alpha = self._press_sprite(press[1])
+            blend_into(dst, image, alpha, int(press[0][0]), int(press[0][1]))
+
+    def to_clips(self):
+        """The moving and the pressed cursor as masked clips for MoviePy."""
+        blank_frame, blank_mask = np.zeros((1, 1, 3)), np.zeros((1, 1))
+
+        def move_frame(t):
+            return self.image if self.state(t)[0] is not None else blank_frame
+
+        def move_mask(t):
+            return self.mask if self.state(t)[0] is not None else blank_mask
+
+        def move_pos(t):
+            return self.state(t)[0] or (0, 0)
+
+        def press_frame(t):
+            press = self.state(t)[1]
+            return self._press_sprite(press[1])[0] if press else blank_frame
+
+        def press_mask(t):
+            press = self.state(t)[1]
+            return self._press_sprite(press[1])[1] if press else blank_mask
+
+        def press_pos(t):
+            press = self.state(t)[1]
+            return press[0] if press else (0, 0)
+
+        clips = []
+        for frame, mask, pos in [
+            (move_frame, move_mask, move_pos),
+            (press_frame, press_mask, press_pos),
+        ]:
+            mask_clip = VideoClip(mask, is_mask=True, duration=self.duration)
+            clip = VideoClip(frame, duration=self.duration).with_mask(mask_clip)
+            clips.append(clip.with_position(pos))
+        return clips
+
+    def click_clips(self, click_sound):
+        """The click sound at the start of every slot."""
+        click_audio = load_audio(click_sound)
+        return [click_audio.with_start(start) for start in self.starts.tolist()]
+
+
+def create_layout_slideshow(
     slideshow_images,
     static_images,
     labels_list,
     video_width,
     video_height,
     total_duration,
-    transition_duration=0.5,
+    transition_duration=None,
     click_sound_path="public/Mouse.mp3",
     cursor_icon_path="public/cursor.png",
+    flatten_static=True,
+    image_cache=None,
+    frame_times=None,
+    layout=DEFAULT_LAYOUT,
+    slideshow=None,
+    design_size=None,
 ):
-    # Validate inputs
-    if len(static_images) != 4 or len(labels_list) != 4:
-        raise ValueError("Require exactly 4 static images and 4 labels")
-
-    # Colors
-    bg_color = (248, 226, 226)
-    card_color = (255, 255, 255)
-    text_color = "black"
-
-    # Layout metrics
-    padding = int(min(video_width, video_height) * 0.04)
-    margin = int(min(video_width, video_height) * 0.02)
-    label_h = 30
-
-    main_w = video_width - 2 * padding
-    main_h = int(video_height * 0.4)
-    rem_h = video_height - main_h - 3 * padding - margin
-    small_h = (rem_h - label_h) // 2
-    small_w = (main_w - margin) // 2
-
-    main_x, main_y = padding, padding
-    grid_y = main_y + main_h + margin
-
-    # Background and main card
-    bg = ColorClip((video_width, video_height), color=bg_color).with_duration(
-        total_duration
-    )
-    shadow_main = (
-        ColorClip((main_w, main_h), color=(200, 200, 200))
-        .with_position((main_x + 6, main_y + 6))
-        .with_duration(total_duration)
-        .with_opacity(0.3)
-    )
-    main_bg = (
-        ColorClip((main_w, main_h), color=card_color)
-        .with_position((main_x, main_y))
-        .with_duration(total_duration)
+    """
+    A layout template (see ``scripts.templates``; the default is the Decory
+    layout: a crossfading main slot above a labelled 2x2 grid, with an
+    animated cursor clicking through the grid cards) as one MoviePy clip.
+
+    ``labels_list`` (None for the template's labels) captions the text
+    layers, ``transition_duration`` overrides the template's slide fades
+    and ``slideshow`` any other key of its slideshow layer. Plain fades are
+    MoviePy effects on the slides; the other transitions are drawn by a
+    ``SlideTrack`` (see ``scripts.transitions``). A ``design_size`` renders
+    the layout designed for that size scaled down to the video size.
+
+    With ``flatten_static`` the background, cards, shadows, static images
+    and labels (none of which change over time) are rasterized once into a
+    single background frame instead of being re-blitted on every frame.
+    ``frame_times`` (the clip-relative times that will be rendered) lets the
+    cursor tabulate its animation up front. The returned clip's
+    ``click_times`` attribute lists when the click sounds start.
+    """
+    layers = build_layers(
+        load_template(layout),
+        slideshow_images,
+        static_images,
+        labels_list,
+        video_width,
+        video_height,
+        total_duration,
+        image_cache,
+        slideshow=slideshow,
+        design_size=design_size,
     )
 
-    # Slideshow clips
-    num_slides = len(slideshow_images)
-    slide_dur = total_duration / max(num_slides, 1)
+    fade = layers["fade"] if transition_duration is None else transition_duration
     slides = []
-
-    for i, img_path in enumerate(slideshow_images):
-        if not os.path.exists(img_path):
-            continue
-        clip = ImageClip(img_path, duration=slide_dur)
-        # Resize to fit
-        tw, th = main_w - 40, main_h - 40
-        scale = min(tw / clip.w, th / clip.h)
-        clip = clip.resized(scale)
-        # Center
-        x = main_x + (main_w - clip.w) // 2
-        y = main_y + (main_h - clip.h) // 2
-        clip = clip.with_position((x, y)).with_start(i * slide_dur)
-        # Fade in/out
-        clip = FadeIn(transition_duration).apply(clip)
-        if i == num_slides - 1:
-            clip = FadeOut(transition_duration).apply(clip)
-        slides.append(clip)
-
-    # Static bottom grid
-    static_clips = []
-    positions = []
-    for idx, (col, row) in enumerate([(0, 0), (1, 0), (0, 1), (1, 1)]):
-        x = padding + col * (small_w + margin)
-        y = grid_y + row * (small_h + margin + label_h)
-        positions.append((x + small_w // 2, y + small_h // 2))
-
-        # Shadow + card
-        sh = (
-            ColorClip((small_w, small_h), color=(200, 200, 200))
-            .with_position((x + 4, y + 4))
-            .with_duration(total_duration)
-            .with_opacity(0.3)
-        )
-        cb = (
-            ColorClip((small_w, small_h), color=card_color)
-            .with_position((x, y))
-            .with_duration(total_duration)
-        )
-        static_clips += [sh, cb]
-
-        # Image
-        img_file = static_images[idx]
-        if os.path.exists(img_file):
-            sti = ImageClip(img_file, duration=total_duration)
-            s = min((small_w - 20) / sti.w, (small_h - 20) / sti.h)
-            sti = sti.resized(s)
-            ix = x + (small_w - sti.w) // 2
-            iy = y + (small_h - sti.h) // 2
-            static_clips.append(sti.with_position((ix, iy)))
-
-        # Label
-        txt = TextClip(
-            text=labels_list[idx], font_size=min(small_w // 10, 16), color=text_color
+    if layers["transition"] not in (None, "fade"):
+        # Hand-overs mix two slides at once: the slot is one SlideTrack clip
+        background = CompositeVideoClip(
+            layers["below"], size=(video_width, video_height)
+        ).get_frame(0)
+        track = SlideTrack(
+            [
+                slide_from_clip(clip, *fades)
+                for clip, fades in zip(layers["slides"], layers["fades"])
+            ],
+            np.asarray(background, np.uint8),
+            layers["slot"],
+            layers["transition"],
+            fade,
         )
-        txt = txt.with_duration(total_duration)
-        tx = x + (small_w - txt.w) // 2
-        ty = y + small_h + 8
-        static_clips.append(txt.with_position((tx, ty)))
+        slot = VideoClip(track.render, duration=total_duration)
+        slides.append(slot.with_position(layers["slot"][:2]))
+    else:
+        for clip, (fade_in, fade_out) in zip(layers["slides"], layers["fades"]):
+            if fade_in:
+                clip = FadeIn(fade).apply(clip)
+            if fade_out:
+                clip = FadeOut(fade).apply(clip)
+            slides.append(clip)
 
     # Cursor sequence
-    cursor_video_clips, cursor_audio_clips = build_cursor_clips(
-        cursor_icon_path,
-        positions,
-        total_duration,
-        slide_dur,
-        click_sound_path,
-    )
-
-    # And update the CompositeVideoClip line:
-    final = CompositeVideoClip(
-        [bg, shadow_main, main_bg] + slides + static_clips + cursor_video_clips
-    )
+    cursor_video_clips, cursor_audio_clips, click_times = [], [], []
+    if layers["cursor_size"] is not None:
+        cursor = CursorOverlay(
+            layers["positions"],
+            layers["slide_duration"],
+            total_duration,
+            layers["cursor_size"],
+        )
+        if frame_times is not None:
+            cursor.precompute(frame_times)
+        cursor_video_clips = cursor.to_clips()
+        cursor_audio_clips = cursor.click_clips(click_sound_path)
+        click_times = cursor.starts.tolist()
+
+    layers = layers["below"] + slides + layers["above"] + cursor_video_clips
+    flattened = False
+    if flatten_static:
+        unflattened = layers
+        layers = flatten_static_clips(
+            layers, (video_width, video_height), total_duration
+        )
+        # Only a new first clip is a background frame covering the layout
+        flattened = all(layers[0] is not clip for clip in unflattened)
+    if len(layers) == 1 and flattened:  # a fully static layout
+        final = layers[0]
+    else:
+        final = IndexedCompositeVideoClip(layers, use_bgclip=flattened)
 
     # Then add the audio:
     if cursor_audio_clips:
 
         final_audio = CompositeAudioClip(cursor_audio_clips)
         final = final.with_audio(final_audio)
+    final.click_times = click_times
     return final
@@ -0,0 +1,112 @@
+"""
+Image preparation for the layouts: every source image is decoded once and
+scaled to each slot it appears in (main slideshow card, grid card).
+
+Results are kept in memory for the life of the process (the job queue's
+``work`` processes reuse them across jobs and voice variants) and, given a
+``RenderCache``, on disk as ``.npy`` files keyed by the source file's hash
+and the target box, so later processes skip decoding and resampling
+altogether. Low-memory renders map those files read-only instead of loading
+them (``shared``).
+"""
+from collections import OrderedDict
+
+import numpy as np
+from imageio.v2 import imread
+from PIL import Image
+
+from scripts.render_cache import file_digest
+
+# Fitted images kept in memory; a few jobs' worth of slides and grid cards
+MEMO_SIZE = 64
+
+_fitted = OrderedDict()
+
+
+def fit_size(size, box):
+    """Size of an image of ``size`` scaled to fit ``box``, as MoviePy's Resize rounds it."""
+    scale = min(box[0] / size[0], box[1] / size[1])
+    return int(size[0] * scale), int(size[1] * scale)
+
+
+def _resize(pic, size):
+    return np.array(Image.fromarray(pic).resize(size, Image.Resampling.LANCZOS))
+
+
+def fit_array(pic, box):
+    """
+    Scale a decoded image to fit ``box`` with Lanczos resampling, producing
+    the same pixels as ``ImageClip(path).resized(scale)``: colour and alpha
+    are resampled separately (PIL would premultiply an RGBA image).
+    """
+    size = fit_size(pic.shape[1::-1], box)
+    if pic.ndim == 3 and pic.shape[2] == 4:
+        alpha = (255 * (1.0 * pic[:, :, 3] / 255)).astype(np.uint8)
+        return np.dstack([_resize(pic[:, :, :3], size), _resize(alpha, size)])
+    return _resize(pic, size)
+
+
+def _remember(key, pic):
+    _fitted[key] = pic
+    _fitted.move_to_end(key)
+    while len(_fitted) > MEMO_SIZE:
+        _fitted.popitem(last=False)
+
+
+def fitted_size(path, box):
+    """Size of the image at ``path`` fitted to ``box``, read from its header."""
+    with Image.open(path) as pic:
+        return fit_size(pic.size, box)
+
+
+def fit_images(requests, cache=None, shared=False):
+    """
+    Return one uint8 array per ``(path, (box_w, box_h))`` request, each image
+    scaled to fit its box. A source requested at several sizes is decoded
+    only once; RGBA results keep their alpha channel, which ``ImageClip``
+    turns into a mask.
+
+    With ``shared``, results are not kept in the in-memory memo, and those in
+    the disk cache come back as read-only memory maps of their ``.npy`` files:
+    the pages belong to the OS page cache, shared by every process rendering
+    the same image and reclaimable under pressure, rather than to this one.
+    """
+    mmap_mode = "r" if shared else None
+    keys = [(file_digest(path), tuple(box)) for path, box in requests]
+    fitted = {}
+    missing = {}
+    for (path, _), key in zip(requests, keys):
+        if key in fitted:
+            continue
+        if key in _fitted:
+            _fitted.move_to_end(key)
+            fitted[key] = _fitted[key]
+            continue
+        entry = cache.lookup(_disk_key(cache, key)) if cache is not None else None
+        if entry is not None:
+            try:
+                fitted[key] = np.load(entry, mmap_mode=mmap_mode)
+                if not shared:
+                    _remember(key, fitted[key])
+                continue
+            except (FileNotFoundError, ValueError):  # evicted or truncated
+                pass
+        missing.setdefault(path, set()).add(key)
+
+    for path, wanted in missing.items():
+        pic = imread(path)
+        for key in wanted:
+            fitted[key] = result = fit_array(pic, key[1])
+            if not shared:
+                _remember(key, result)
+            if cache is not None:
+                cache.write(_disk_key(cache, key), lambda f: np.save(f, result))
+                entry = cache.lookup(_disk_key(cache, key)) if shared else None
+                if entry is not None:
+                    fitted[key] = np.load(entry, mmap_mode=mmap_mode)
+    return [fitted[key] for key in keys]
+
+
+def _disk_key(cache, key):
+    digest, box = key
+    return cache.key(image=digest, box=list(box), resample="lanczos")
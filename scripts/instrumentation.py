@@ -0,0 +1,177 @@
+"""
+Structured progress and timing events, plus an optional profiler hook.
+
+Events are JSON lines written to a file descriptor opened with
+``open_events`` (``--events-fd``), separate from the human-oriented
+progress bars on stderr::
+
+    {"event": "stage_start", "stage": "layout", "time": 1718000000.1}
+    {"event": "stage_end", "stage": "layout", "ok": true, "seconds": 1.2,
+     "peak_rss_mb": 210.5, ...}
+    {"event": "progress", "stage": "encode", "frames": 120, "total": 216,
+     "fps": 31.2, "eta": 3.1, ...}
+
+Fields set with ``bind`` (e.g. the worker's job id) are added to every
+event, and callbacks registered with ``listen`` (e.g. the job queue's, to
+record progress) get them as dicts. Without an events fd or a listener
+every call here is a no-op.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_sink = None
+_fields = {}
+_listeners = []
+
+
+def open_events(fd):
+    """Send events to the file descriptor ``fd``, or nowhere if None."""
+    global _sink
+    _sink = None if fd is None else os.fdopen(fd, "w", buffering=1, closefd=False)
+
+
+def bind(**fields):
+    """Fields added to every following event; None removes a field."""
+    for key, value in fields.items():
+        if value is None:
+            _fields.pop(key, None)
+        else:
+            _fields[key] = value
+
+
+def listen(callback):
+    """Call ``callback`` with every following event, as a dict."""
+    _listeners.append(callback)
+
+
+def mute():
+    """Drop the events fd and listeners (e.g. in forked worker processes)."""
+    global _sink
+    _sink = None
+    del _listeners[:]
+
+
+def emit(event, **fields):
+    if _sink is None and not _listeners:
+        return
+    message = {"event": event, "time": round(time.time(), 3), **_fields, **fields}
+    for callback in _listeners:
+        callback(message)
+    if _sink is None:
+        return
+    try:
+        _sink.write(json.dumps(message) + "\n")
+    except (OSError, ValueError):  # reader went away; events are best-effort
+        pass
+
+
+def peak_rss_mb(children=False):
+    """Peak resident memory of this process (or its children) in MB."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def stage(name):
+    """Emit ``stage_start``/``stage_end`` (with duration and peak memory)."""
+    emit("stage_start", stage=name)
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        emit(
+            "stage_end",
+            stage=name,
+            ok=ok,
+            seconds=round(time.perf_counter() - started, 3),
+            peak_rss_mb=peak_rss_mb(),
+        )
+
+
+class Progress:
+    """
+    Callable reporting ``frames`` done out of ``total`` as ``progress``
+    events, at most every ``interval`` seconds (and always for the last
+    frame), with the frame rate so far and the estimated time left. Frames
+    already done at the first call (e.g. taken from a cache) do not count
+    towards the rate.
+    """
+
+    def __init__(self, total, stage="encode", interval=0.5):
+        self.total = total
+        self.stage = stage
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.first = None
+        self.last = None
+
+    def __call__(self, frames):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = frames
+        elif frames < self.total and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = now - self.started
+        fps = (frames - self.first) / elapsed if elapsed > 0 else 0.0
+        emit(
+            "progress",
+            stage=self.stage,
+            frames=frames,
+            total=self.total,
+            fps=round(fps, 2),
+            eta=round((self.total - frames) / fps, 1) if fps else None,
+        )
+
+
+@contextmanager
+def profiled(profiler, path):
+    """
+    Run the block under ``profiler`` ("cprofile" or "pyinstrument", or None
+    for no profiling) and save the report to ``path``: pstats data for
+    cProfile, an HTML page for pyinstrument.
+    """
+    if profiler is None:
+        yield
+        return
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError(
+                "--profiler pyinstrument needs `pip install pyinstrument`"
+            )
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profile.output_html())
+    else:
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
+    print("Profile written to %s" % path, file=sys.stderr)
+    emit("profile", profiler=profiler, path=path)
@@ -0,0 +1,33 @@
+"""
+Lookup of the items live at a time ``t`` among many ``[start, end)``
+intervals, without scanning them all.
+"""
+from bisect import bisect_left, bisect_right
+
+
+class IntervalIndex:
+    """
+    The ``[start, end)`` intervals (``end`` None for open-ended) split the
+    time line into segments between consecutive starts and ends, over which
+    the set of live intervals cannot change. That set is tabulated once per
+    segment, so ``live(t)`` is a binary search plus a list lookup, whatever
+    the number of intervals. Indices come back in their original order.
+    """
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        self.bounds = sorted(
+            {start for start, _ in intervals}
+            | {end for _, end in intervals if end is not None}
+        )
+        self.segments = [[] for _ in self.bounds]
+        for i, (start, end) in enumerate(intervals):
+            first = bisect_left(self.bounds, start)
+            last = len(self.bounds) if end is None else bisect_left(self.bounds, end)
+            for segment in self.segments[first:last]:
+                segment.append(i)
+
+    def live(self, t):
+        """Indices of the intervals with ``start <= t < end``."""
+        k = bisect_right(self.bounds, t) - 1
+        return self.segments[k] if k >= 0 else []
@@ -0,0 +1,548 @@
+#!/usr/bin/env python
+"""
+Durable render job queue in SQLite, consumed by its ``work`` processes.
+
+``POST /api/videos`` submits jobs and returns at once, workers started with
+``work`` render them in priority order, and ``/api/videos/progress`` polls
+their ``status``::
+
+    python scripts/job_queue.py submit --priority interactive -- \\
+        --output out.mp4 --audio vo.mp3 a.png b.png ...
+    {"id": "3f2a...", "status": "queued", "output": "out.mp4", "position": 0,
+     "deduplicated": false, ...}
+    python scripts/job_queue.py status 3f2a...
+    python scripts/job_queue.py work --workers 4
+
+The web app keeps one ``serve`` process instead, sending it the same
+requests as JSON lines (see ``serve``).
+
+A ``work`` process runs its jobs in-process, one after another, so MoviePy
+is imported once and the decoded assets (``assets``, ``images``) and the
+Whisper model (``transcribe.get_transcriber``) stay loaded between jobs.
+
+Without render arguments, ``submit`` reads the job as JSON from stdin:
+``{"args": [...], "transcribe": [...], "priority": "batch"}``. A job with
+``transcribe`` (the command line of ``transcribe.py``) first transcribes its
+voice-over, and the subtitles written are passed to the render.
+
+A job is keyed by a hash of all its video depends on: the options that shape
+the picture and sound, and the contents of every input file. Submitting a
+job whose key matches a queued or running job, or a finished one whose
+output still exists, returns that job instead of rendering it again.
+
+Failed jobs are retried with exponential backoff, up to ``--max-attempts``
+runs, except those whose arguments or inputs are invalid, which fail at
+once. A running job holds a lease its worker renews with a heartbeat; the
+job of a worker that died (OOM kill, ...) is queued again once it expires.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager, redirect_stdout
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts import instrumentation
+from scripts.render_cache import file_digest
+from scripts.workspace import interrupt_on_sigterm
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "video-gen-queue.sqlite")
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 10.0  # seconds before the first retry, doubling after each
+LEASE = 120.0  # seconds a running job is kept without a heartbeat
+POLL_INTERVAL = 1.0
+
+# Options that do not change the video a job produces
+UNKEYED_RENDER = {
+    "output",
+    "events_fd",
+    "profiler",
+    "profiler_output",
+    "manifest",
+    "jobs",
+    "cache_dir",
+    "cache_size_mb",
+    "no_render_cache",
+    "workspace_root",
+    "encode_queue",
+    "segments",
+}
+UNKEYED_TRANSCRIBE = {"output_dir", "device", "cache_dir", "cache_size_mb", "no_cache"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,  -- queued, running, done or error
+    spec TEXT NOT NULL,  -- {"args": [...], "transcribe": [...] or null}
+    output TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL,
+    worker TEXT,
+    progress TEXT,  -- last progress or stage event
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (key);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, created);
+"""
+
+
+# ───────────────────────────── Job keys ──────────────────────────
+def _fingerprint(args, unkeyed):
+    """Parsed options minus ``unkeyed``, with files named by their contents."""
+
+    def value(v):
+        if isinstance(v, list):
+            return [value(item) for item in v]
+        if isinstance(v, str) and os.path.isfile(v):
+            return "sha256:" + file_digest(v)
+        return v
+
+    return {k: value(v) for k, v in sorted(vars(args).items()) if k not in unkeyed}
+
+
+def job_key(spec):
+    """
+    Hash of everything the video of ``spec`` depends on; also returns its
+    output path. Raises ``ValueError`` for arguments the render would reject.
+    """
+    from scripts import transcribe
+    from scripts.moviepy_create_video import build_parser, parse_job_args
+    from scripts.templates import layout_path
+
+    parser = build_parser()
+    try:
+        args = parse_job_args(parser, spec["args"])
+        # A layout shipped here is named, not given as a path: key its file
+        args.layout = layout_path(args.layout)
+        # Extra outputs named after the output count by that name's suffix,
+        # so a duplicate's are found next to its output
+        stem = os.path.splitext(args.output)[0]
+        args.extra_outputs = [
+            dict(extra, path=extra["path"][len(stem) :])
+            if extra["path"].startswith(stem)
+            else extra
+            for extra in args.extra_outputs
+        ]
+        parts = {"render": _fingerprint(args, UNKEYED_RENDER)}
+        if spec.get("transcribe"):
+            options = transcribe.build_parser().parse_args(spec["transcribe"])
+            parts["transcribe"] = _fingerprint(options, UNKEYED_TRANSCRIBE)
+    except SystemExit:
+        raise ValueError("invalid arguments (argparse output is on stderr)")
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest(), args.output
+
+
+# ─────────────────────────────── Queue ───────────────────────────
+class JobQueue:
+    """
+    The jobs table of the SQLite database at ``path``. Safe to use from
+    several threads and processes at once: every thread (and forked child)
+    opens its own connection, and claiming a job is one write transaction.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return self._local.db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def submit(self, spec, priority="normal", max_attempts=MAX_ATTEMPTS):
+        """
+        Queue the job ``spec`` (``args``, optional ``transcribe``), or return
+        the matching job already queued, running or done. Returns its status
+        with ``deduplicated`` telling which. Raises ``ValueError`` for an
+        unknown ``priority`` or arguments the render would reject.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError("unknown priority %r" % priority)
+        key, output = job_key(spec)
+        rank = PRIORITIES[priority]
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE key = ? AND status != 'error' "
+                "ORDER BY created DESC",
+                (key,),
+            ).fetchall()
+            for row in rows:
+                if row["status"] == "done" and not os.path.exists(row["output"]):
+                    continue
+                if row["status"] == "queued" and rank < row["priority"]:
+                    db.execute(
+                        "UPDATE jobs SET priority = ? WHERE id = ?", (rank, row["id"])
+                    )
+                job_id, deduplicated = row["id"], True
+                break
+            else:
+                job_id, deduplicated = uuid.uuid4().hex, False
+                spec = {"args": spec["args"], "transcribe": spec.get("transcribe")}
+                db.execute(
+                    "INSERT INTO jobs (id, key, priority, status, spec, output, "
+                    "max_attempts, not_before, created) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?, 0, ?)",
+                    (
+                        job_id,
+                        key,
+                        rank,
+                        json.dumps(spec),
+                        output,
+                        max_attempts,
+                        time.time(),
+                    ),
+                )
+        return dict(self.status(job_id), deduplicated=deduplicated)
+
+    def claim(self, worker):
+        """
+        Take the most urgent job that is due, or None. Jobs of workers whose
+        lease expired are queued again first (or failed, out of attempts).
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET worker = NULL, not_before = 0, "
+                "error = 'worker stopped responding', "
+                "status = CASE WHEN attempts < max_attempts "
+                "THEN 'queued' ELSE 'error' END, "
+                "finished = CASE WHEN attempts < max_attempts "
+                "THEN NULL ELSE ? END "
+                "WHERE status = 'running' AND heartbeat < ?",
+                (now, now - LEASE),
+            )
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                "ORDER BY priority, created LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, "
+                "attempts = attempts + 1, started = ?, heartbeat = ?, "
+                "progress = NULL WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+        return {"id": row["id"], "spec": json.loads(row["spec"])}
+
+    def heartbeat(self, job_id, progress=None):
+        """Renew the lease of a running job, recording its last event."""
+        if progress is None:
+            query, params = "UPDATE jobs SET heartbeat = ?", (time.time(),)
+        else:
+            query = "UPDATE jobs SET heartbeat = ?, progress = ?"
+            params = (time.time(), json.dumps(progress))
+        self._db().execute(
+            query + " WHERE id = ? AND status = 'running'", params + (job_id,)
+        )
+
+    def finish(self, job_id, result):
+        self._db().execute(
+            "UPDATE jobs SET status = 'done', finished = ?, result = ?, "
+            "error = NULL WHERE id = ?",
+            (time.time(), json.dumps(result), job_id),
+        )
+
+    def fail(self, job_id, error, retry=True):
+        """
+        Retry the job after a backoff, or fail it if out of attempts (or at
+        once without ``retry``).
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if retry and row["attempts"] < row["max_attempts"]:
+                delay = RETRY_DELAY * 2 ** (row["attempts"] - 1)
+                db.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, "
+                    "not_before = ?, error = ? WHERE id = ?",
+                    (now + delay, error, job_id),
+                )
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = 'error', finished = ?, error = ? "
+                    "WHERE id = ?",
+                    (now, error, job_id),
+                )
+
+    def release(self, job_id):
+        """Put back a job its worker was stopped in the middle of."""
+        self._db().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, "
+            "attempts = attempts - 1 WHERE id = ? AND status = 'running'",
+            (job_id,),
+        )
+
+    def status(self, job_id):
+        """JSON-able state of a job, or None for an unknown id."""
+        db = self._db()
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        status = {
+            "id": row["id"],
+            "status": row["status"],
+            "priority": next(k for k, v in PRIORITIES.items() if v == row["priority"]),
+            "output": row["output"],
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+        if row["status"] == "queued":
+            # Jobs claimed before this one
+            status["position"] = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND "
+                "(priority < ? OR (priority = ? AND created < ?))",
+                (row["priority"], row["priority"], row["created"]),
+            ).fetchone()[0]
+        return status
+
+
+# ────────────────────────────── Workers ──────────────────────────
+def run_claimed(queue, job, parser, transcribe_parser):
+    """Run a claimed job to completion, renewing its lease meanwhile."""
+    from scripts import transcribe
+    from scripts.moviepy_create_video import run_job
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(LEASE / 4):
+            queue.heartbeat(job["id"])
+
+    heart = threading.Thread(target=beat, daemon=True)
+    heart.start()
+    instrumentation.bind(job=job["id"])
+    try:
+        spec = job["spec"]
+        args = list(spec["args"])
+        result = {"status": "done"}
+        if spec.get("transcribe"):
+            result = transcribe.run_transcribe(spec["transcribe"], transcribe_parser)
+            if result["status"] == "done":
+                args += ["--subtitles", result["subtitles"][0]]
+        if result["status"] == "done":
+            result = run_job(args, parser)
+        if result["status"] == "done":
+            queue.finish(job["id"], result)
+        else:  # invalid arguments or inputs would fail again
+            queue.fail(job["id"], result["error"], retry=not result.get("invalid"))
+    except BaseException:
+        queue.release(job["id"])
+        raise
+    finally:
+        stop.set()
+        instrumentation.bind(job=None)
+
+
+def work_loop(path, poll=POLL_INTERVAL):
+    """Claim and run jobs one after another, forever."""
+    from scripts import transcribe
+    from scripts.moviepy_create_video import build_parser
+
+    queue = JobQueue(path)
+    parser, transcribe_parser = build_parser(), transcribe.build_parser()
+    worker = "%s:%d" % (socket.gethostname(), os.getpid())
+    current = {}
+
+    def record(event):
+        if "id" in current and event["event"] in ("progress", "stage_start"):
+            queue.heartbeat(current["id"], event)
+
+    instrumentation.listen(record)
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll)
+            continue
+        current["id"] = job["id"]
+        try:
+            run_claimed(queue, job, parser, transcribe_parser)
+        finally:
+            current.clear()
+
+
+def work(path, workers=1, poll=POLL_INTERVAL):
+    """
+    Run ``workers`` worker processes, restarting any that dies (its job is
+    queued again once its lease expires).
+    """
+    if workers == 1:
+        work_loop(path, poll)
+        return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    processes = [None] * workers
+    try:
+        while True:
+            for i, process in enumerate(processes):
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        print(
+                            "Worker %d exited (%s), restarting"
+                            % (process.pid, process.exitcode),
+                            file=sys.stderr,
+                        )
+                    processes[i] = context.Process(target=work_loop, args=(path, poll))
+                    processes[i].start()
+            time.sleep(poll)
+    finally:
+        for process in processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in processes:
+            if process is not None:
+                process.join()
+
+
+# ────────────────────────────── Server ───────────────────────────
+def serve(queue, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Answer ``submit`` and ``status`` requests, one JSON line each, until
+    stdin closes, for a client that keeps one process (with the modules
+    ``job_key`` imports loaded) rather than starting one per request::
+
+        {"request": 1, "command": "submit", "spec": {"args": [...]},
+         "priority": "interactive"}
+        {"request": 1, "reply": {"id": "3f2a...", "status": "queued", ...}}
+        {"request": 2, "command": "status", "ids": ["3f2a..."]}
+        {"request": 2, "reply": [{"id": "3f2a...", "status": "running", ...}]}
+
+    The reply to a rejected request is ``{"status": "error", "error": ...}``.
+    """
+
+    def answer(request, reply):
+        stdout.write(json.dumps({"request": request, "reply": reply}) + "\n")
+        stdout.flush()
+
+    for line in stdin:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            # Anything printed while keying a job stays off the replies
+            with redirect_stdout(sys.stderr):
+                if request["command"] == "submit":
+                    spec = request["spec"]
+                    reply = queue.submit(
+                        spec,
+                        request.get("priority") or spec.get("priority", "normal"),
+                        request.get("max_attempts", MAX_ATTEMPTS),
+                    )
+                elif request["command"] == "status":
+                    reply = [queue.status(job_id) for job_id in request["ids"]]
+                else:
+                    raise ValueError("unknown command %r" % request["command"])
+        except (ValueError, KeyError, TypeError) as exc:
+            reply = {"status": "error", "error": str(exc) or repr(exc)}
+        answer(request.get("request") if isinstance(request, dict) else None, reply)
+
+
+# ────────────────────────────── CLI ──────────────────────────────
+def build_parser():
+    parser = argparse.ArgumentParser(description="Durable render job queue")
+    parser.add_argument(
+        "--db",
+        default=os.getenv("RENDER_QUEUE_DB", DEFAULT_DB),
+        help="SQLite database of the queue",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="queue a render, print its status")
+    submit.add_argument("--priority", choices=list(PRIORITIES))
+    submit.add_argument(
+        "--max-attempts",
+        type=int,
+        default=MAX_ATTEMPTS,
+        help="runs before a failing job is given up",
+    )
+    submit.add_argument(
+        "render_args",
+        nargs=argparse.REMAINDER,
+        help="moviepy_create_video.py arguments, after --; else JSON on stdin",
+    )
+
+    status = commands.add_parser("status", help="print the status of jobs")
+    status.add_argument("ids", nargs="+")
+
+    commands.add_parser(
+        "serve", help="answer submit and status requests in JSON lines on stdin"
+    )
+
+    work_cmd = commands.add_parser("work", help="run the queue's work processes")
+    work_cmd.add_argument("--workers", type=int, default=1)
+    work_cmd.add_argument(
+        "--poll", type=float, default=POLL_INTERVAL, help="seconds between polls"
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    queue = None if args.command == "work" else JobQueue(args.db)
+    if args.command == "submit":
+        render_args = args.render_args
+        if render_args[:1] == ["--"]:
+            render_args = render_args[1:]
+        spec = {"args": render_args} if render_args else json.load(sys.stdin)
+        priority = args.priority or spec.get("priority", "normal")
+        try:
+            status = queue.submit(spec, priority, args.max_attempts)
+        except ValueError as exc:
+            print(json.dumps({"status": "error", "error": str(exc)}))
+            sys.exit(1)
+        print(json.dumps(status))
+    elif args.command == "status":
+        print(json.dumps([queue.status(job_id) for job_id in args.ids]))
+    elif args.command == "serve":
+        serve(queue)
+    else:
+        interrupt_on_sigterm()
+        work(args.db, args.workers, args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,271 +4,1262 @@ Create a slideshow‑style video from still images, with optional intro/outro
 cards, a voice‑over track, and (quieter) background music.
 """
 import argparse
-import math
+import json
 import os
 import sys
-from moviepy.video.tools.subtitles import SubtitlesClip
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+import numpy as np
+from PIL import Image
 
 from moviepy import (
-    ImageClip,
-    TextClip,
     VideoFileClip,
-    afx,
+    VideoClip,
     AudioFileClip,
     concatenate_videoclips,
-    CompositeAudioClip,
 )
 import multiprocessing
-from moviepy.video.fx.CrossFadeIn import CrossFadeIn
-from moviepy.video.fx.Crop import Crop
-from moviepy.video.VideoClip import ColorClip
 from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from scripts.function import (
-    create_decory_slideshow,
-)
-
-USE_FAKE_DATA = os.getenv("USE_FAKE_DATA", "false").lower() == "true"
-
-
-# ────────────────────────────── CLI ──────────────────────────────
-parser = argparse.ArgumentParser(
-    description="Create video from images + optional intro/outro + audio/music"
-)
-parser.add_argument("--audio", help="voice‑over audio file (drives timing if given)")
-parser.add_argument(
-    "--music", help="background music file (will be mixed under the voice‑over)"
+from scripts.assets import lazy_video, load_image, load_info
+from scripts.audio_mix import AudioMix
+from scripts.captions import CAPTION_STYLE, CaptionTrack, fit_style, write_webvtt
+from scripts.encoder import (
+    DEFAULT_PROFILE,
+    PROFILES,
+    animation_output,
+    profile_params,
+    still_output,
+    video_output,
 )
-parser.add_argument(
-    "--music-volume",
-    type=float,
-    default=0.10,
-    help="linear gain to apply to background music (default 0.10 = −20 dB)",
-)
-parser.add_argument("--intro", help="PNG for intro card (fixed 2 s)")
-parser.add_argument("--outro", help="PNG for outro card (fixed 2 s)")
-parser.add_argument(
-    "--duration",
-    type=float,
-    default=3,
-    help=(
-        "Total seconds to divide equally among main images "
-        "(ignored if --audio is supplied)"
-    ),
+from scripts import instrumentation
+from scripts.instrumentation import Progress, profiled, stage
+from scripts.function import (
+    create_layout_slideshow,
 )
-parser.add_argument("--fps", type=int, default=24, help="frames per second")
-parser.add_argument("--output", required=True, help="output video path (e.g. out.mp4)")
-parser.add_argument("images", nargs="+", help="main image files (PNG, JPG, …)")
-parser.add_argument("--width", type=int, default=900, help="output video width")
-parser.add_argument("--height", type=int, default=1600, help="output video height")
-parser.add_argument(
-    "--subtitles",
-    help="Subtitles file (e.g. .srt) to overlay as captions",
+from scripts.numpy_renderer import (
+    LayoutFrameRenderer,
+    TimelineCanvas,
+    still,
+    write_timeline,
 )
-parser.add_argument(
-    "--transition-duration",
-    type=float,
-    default=1.0,
-    help="crossfade duration between consecutive clips in seconds",
+from scripts.render_cache import DEFAULT_CACHE_DIR, RenderCache, file_digest
+from scripts.templates import (
+    DEFAULT_LAYOUT,
+    load_template,
+    schedule_slides,
+    slideshow_layer,
+    split_images,
 )
-parser.add_argument(
-    "--audio-volume",
-    type=float,
-    default=1.0,
-    help="gain to apply to the voice-over audio (e.g. 1.5 = +50%)",
+from scripts.transitions import TRANSITIONS
+from scripts.workspace import DEFAULT_WORKSPACE_ROOT, JobWorkspace, interrupt_on_sigterm
+from scripts.segments import (
+    concat_segments,
+    copy_frames,
+    frame_at,
+    parameter_sets,
+    plan_segments,
 )
-args = parser.parse_args()
+
+USE_FAKE_DATA = os.getenv("USE_FAKE_DATA", "false").lower() == "true"
+
 
 # ────────────────────────────── Constants ────────────────────────
 INTRO_DURATION = 3.0
 OUTRO_DURATION = 2.0
-num_images = len(args.images)
-if num_images == 0:
-    raise ValueError("You must provide at least one main image.")
-
-# ──────────────────────────── Timing logic ───────────────────────
-if args.audio:  # use voice‑over length
-    vo_clip = AudioFileClip(args.audio)
-    total_time = 10.0 if USE_FAKE_DATA else vo_clip.duration
-    remaining_time = max(total_time - INTRO_DURATION - OUTRO_DURATION, 0)
-    image_duration = remaining_time / num_images
-else:  # fall back to explicit --duration
-    total_time = INTRO_DURATION + OUTRO_DURATION + args.duration
-    image_duration = args.duration / num_images
-    vo_clip = None  # may be added later
-
-# ─────────────────────────── Build video track ───────────────────
-clips = []
-
-if args.intro:
-    clips.append(VideoFileClip(args.intro).with_duration(INTRO_DURATION))
-# clips.append(ImageClip(args.intro).with_duration(INTRO_DURATION))
-
-# for img in args.images:
-#     clip = ImageClip(img, duration=image_duration).resized(height=args.height)
-#     clips.append(clip)
-
-
-# Create clips for each image, resized to fit the video dimensions
-# grid_clip = create_image_grid(
-#     images_list=args.images,  # Can be 5, 10, 15, or any number of images
-#     video_width=args.width,
-#     video_height=args.height,
-#     duration=remaining_time,
-# )
-grid_clip = create_decory_slideshow(
-    slideshow_images=args.images,
-    static_images=args.images[1:],
-    labels_list=["Minimal", "Futuristic", "Luxury", "Modern"],
-    video_width=args.width,
-    video_height=args.height,
-    total_duration=remaining_time,
-    # total_duration=5,
-    # transition_duration=0.5,
+CLICK_SOUND = "public/Mouse.mp3"
+PREVIEW_SCALE = 1 / 3  # of the frame size, for --preview
+PREVIEW_FPS = 12
+# --extra-output kinds by extension, and the options each takes
+OUTPUT_KINDS = {
+    ".mp4": "video",
+    ".mov": "video",
+    ".jpg": "still",
+    ".jpeg": "still",
+    ".png": "still",
+    ".gif": "animation",
+    ".webp": "animation",
+}
+OUTPUT_OPTIONS = {
+    "video": ("size", "scale", "profile"),
+    "still": ("size", "at"),
+    "animation": ("size", "start", "duration", "fps", "width"),
+}
+ANIMATION_DURATION = 3.0
+ANIMATION_FPS = 10
+ANIMATION_WIDTH = 320
+
+
+# ────────────────────────────── CLI ──────────────────────────────
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Create video from images + optional intro/outro + audio/music"
+    )
+    parser.add_argument("--audio", help="voice‑over audio file (drives timing if given)")
+    parser.add_argument(
+        "--music", help="background music file (will be mixed under the voice‑over)"
+    )
+    parser.add_argument(
+        "--music-volume",
+        type=float,
+        default=0.10,
+        help="linear gain to apply to background music (default 0.10 = −20 dB)",
+    )
+    parser.add_argument("--intro", help="PNG for intro card (fixed 2 s)")
+    parser.add_argument("--outro", help="PNG for outro card (fixed 2 s)")
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=3,
+        help=(
+            "Total seconds to divide equally among main images "
+            "(ignored if --audio is supplied)"
+        ),
+    )
+    parser.add_argument("--fps", type=int, default=24, help="frames per second")
+    parser.add_argument("--output", help="output video path (e.g. out.mp4)")
+    parser.add_argument("images", nargs="*", help="main image files (PNG, JPG, …)")
+    parser.add_argument("--width", type=int, default=900, help="output video width")
+    parser.add_argument("--height", type=int, default=1600, help="output video height")
+    parser.add_argument(
+        "--subtitles",
+        help="Subtitles file (e.g. .srt) to overlay as captions",
+    )
+    parser.add_argument(
+        "--transition-duration",
+        type=float,
+        default=1.0,
+        help="crossfade duration between consecutive clips in seconds",
+    )
+    parser.add_argument(
+        "--audio-volume",
+        type=float,
+        default=1.0,
+        help="gain to apply to the voice-over audio (e.g. 1.5 = +50%)",
+    )
+    parser.add_argument(
+        "--no-flatten-static",
+        action="store_true",
+        help="re-composite static layout layers every frame instead of once",
+    )
+    parser.add_argument(
+        "--layout",
+        default=DEFAULT_LAYOUT,
+        help=(
+            "layout template: the name of one in scripts/layouts (decory, "
+            "decory_crossfade, image_grid) or the path of a JSON/YAML file"
+        ),
+    )
+    parser.add_argument(
+        "--transition",
+        choices=TRANSITIONS,
+        help="slide transition, instead of the layout's (default: fade)",
+    )
+    parser.add_argument(
+        "--labels",
+        help="comma-separated captions of the layout's cards (default: the layout's)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["moviepy", "numpy"],
+        default="moviepy",
+        help="frame renderer: MoviePy compositing or the direct NumPy renderer",
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help=(
+            "numpy engine: decode each slide only while it is shown and "
+            "memory-map cached images, so memory stays flat however many "
+            "slides there are"
+        ),
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=1,
+        help=(
+            "split the timeline at scene cuts into N pieces rendered by "
+            "parallel processes and joined without re-encoding"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=DEFAULT_PROFILE,
+        help=(
+            "encoder settings: draft (fastest, smallest), social (balanced) "
+            "or archive (best quality)"
+        ),
+    )
+    parser.add_argument(
+        "--pix-fmt",
+        help=(
+            "output pixel format, converted by ffmpeg from the RGB frames "
+            "(default yuv420p)"
+        ),
+    )
+    parser.add_argument(
+        "--vfr",
+        action="store_true",
+        help=(
+            "variable frame rate output: with the numpy engine, frames held "
+            "on screen (outro card, slides between transitions) are encoded "
+            "once, as long frames, instead of repeated at --fps"
+        ),
+    )
+    parser.add_argument(
+        "--encode-queue",
+        type=int,
+        default=4,
+        help=(
+            "frames buffered between frame generation and the encoder so "
+            "both run at once (0 = write each frame synchronously)"
+        ),
+    )
+    parser.add_argument(
+        "--events-fd",
+        type=int,
+        help=(
+            "file descriptor to write JSON-lines progress and stage timing "
+            "events to"
+        ),
+    )
+    parser.add_argument(
+        "--profiler",
+        choices=["cprofile", "pyinstrument"],
+        help="profile the render with cProfile or pyinstrument",
+    )
+    parser.add_argument(
+        "--profiler-output",
+        help=(
+            "where to save the profile (default: next to --output, as .prof "
+            "for cProfile or .html for pyinstrument)"
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        help=(
+            "JSON batch manifest; renders every job in it through a process "
+            "pool instead of a single video"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for --manifest (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("RENDER_CACHE_DIR", DEFAULT_CACHE_DIR),
+        help=(
+            "directory of pre-encoded intro/outro pieces and pre-resized "
+            "images reused across videos"
+        ),
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=float,
+        default=2048,
+        help=(
+            "size limit of each cache in --cache-dir; least recently used "
+            "entries are evicted"
+        ),
+    )
+    parser.add_argument(
+        "--workspace-root",
+        default=os.getenv("RENDER_WORKSPACE_ROOT", DEFAULT_WORKSPACE_ROOT),
+        help=(
+            "where each render gets its private working directory (e.g. "
+            "/dev/shm to keep intermediate files in memory); the output is "
+            "moved into place once complete"
+        ),
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help=(
+            "fast draft of the same video: %d%% of the size (the layout "
+            "scaled down as a whole), at most %d fps, numpy engine, and "
+            "subtitles written next to the output as a WebVTT file instead "
+            "of burnt in" % (round(PREVIEW_SCALE * 100), PREVIEW_FPS)
+        ),
+    )
+    parser.add_argument(
+        "--poster",
+        type=float,
+        metavar="T",
+        help=(
+            "write only the frame at T seconds, as an image (--output "
+            "poster.png or .jpg), instead of the video"
+        ),
+    )
+    parser.add_argument(
+        "--extra-output",
+        dest="extra_outputs",
+        action="append",
+        default=[],
+        type=output_spec,
+        metavar="PATH[,KEY=VALUE...]",
+        help=(
+            "also write PATH, in the same pass as --output (repeatable). By "
+            "extension: a video (.mp4/.mov; size=WxH for its own layout, "
+            "with the intro, outro and captions scaled to fit, scale=F of "
+            "its layout's frames, profile=NAME), a still (.jpg/.png; "
+            "at=SECONDS, default mid-video) or a looping animation "
+            "(.gif/.webp; start=, duration=, fps=, width=; from the "
+            "layout's start by default). Frames are rendered once per "
+            "distinct size; the render cache is not used"
+        ),
+    )
+    parser.add_argument(
+        "--no-render-cache",
+        action="store_true",
+        help=(
+            "encode the intro/outro and resize the images every time instead "
+            "of reusing cached results"
+        ),
+    )
+    return parser
+
+
+def parse_job_args(parser, argv):
+    """Parse one render's argv, requiring what a single video needs."""
+    args = parser.parse_args(argv)
+    if not args.output or not args.images:
+        parser.error("--output and at least one image are required")
+    if args.preview:
+        args.engine, args.profile = "numpy", "draft"
+        args.fps = min(args.fps, PREVIEW_FPS)
+    if args.low_memory and args.engine != "numpy":
+        parser.error("--low-memory needs --engine numpy")
+    if args.poster is not None and args.poster < 0:
+        parser.error("--poster needs a time >= 0")
+    if args.extra_outputs:
+        if args.preview or args.poster is not None or args.segments > 1:
+            parser.error(
+                "--extra-output cannot be combined with --preview, --poster "
+                "or --segments"
+            )
+        main = (args.width, args.height)
+        for size in {spec.get("size", main) for spec in args.extra_outputs}:
+            if size != main and not any(
+                spec["kind"] == "video"
+                and spec.get("size") == size
+                and "scale" not in spec
+                for spec in args.extra_outputs
+            ):
+                parser.error(
+                    "--extra-output: outputs at size %dx%d need an unscaled "
+                    "video of that size to be cut from" % size
+                )
+    return args
+
+
+def _frame_size(text):
+    width, height = (int(v) for v in text.lower().split("x"))
+    return (width, height)
+
+
+def _profile_name(text):
+    if text not in PROFILES:
+        raise ValueError(text)
+    return text
+
+
+_OPTION_TYPES = dict(
+    size=_frame_size,
+    scale=float,
+    profile=_profile_name,
+    at=float,
+    start=float,
+    duration=float,
+    fps=float,
+    width=int,
 )
 
-clips.append(grid_clip)
-
-if args.outro:
-    clips.append(ImageClip(args.outro).with_duration(OUTRO_DURATION))
-
-# if args.transition_duration > 0:
-#     from moviepy import CompositeVideoClip
-
-#     transition = args.transition_duration
-#     xf_clips = []
-#     current = 0.0
-#     for idx, clip in enumerate(clips):
-#         # schedule each clip at its start time
-#         clip = clip.with_start(current)
-#         # fade in for every clip except the very first
-#         if 0 < idx < len(clips) - 1:
-#             clip = CrossFadeIn(transition).apply(clip)
-#         xf_clips.append(clip)
-#         # advance time by clip duration minus overlap
-#         overlap = transition if idx < len(clips) - 1 else 0.0
-#         current += clip.duration - overlap
-
-#     video = CompositeVideoClip(xf_clips).with_duration(current)
-# else:
-video = concatenate_videoclips(clips, method="compose")
-
-video = video.with_fps(args.fps)
-# video = video.resized(args.height, args.width)
-# ──────────────── Overlay subtitles if provided ────────────────
-from moviepy.video.fx.Margin import Margin
-from PIL import Image, ImageDraw
-import numpy as np
 
-if args.subtitles:
-    # Alternative with background box styling
-    def make_text_clip_rounded(txt, corner_radius=20, padding=20):
-        # Create the text without background first
-        text_clip = TextClip(
-            text=txt,
-            font_size=46,
-            color="white",
-            stroke_color="black",
-            stroke_width=1,
-            method="caption",
-            text_align="center",
-            size=(780, None),
-            interline=-3,
+def output_spec(text):
+    """
+    Parse an ``--extra-output`` ``PATH[,KEY=VALUE...]`` into a dict of the
+    ``path``, its ``kind`` (from the extension, see ``OUTPUT_KINDS``) and
+    its options, converted.
+    """
+    path, *options = text.split(",")
+    kind = OUTPUT_KINDS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise argparse.ArgumentTypeError(
+            "%s: unsupported output type (use %s)"
+            % (path, ", ".join(sorted(OUTPUT_KINDS)))
+        )
+    spec = dict(path=path, kind=kind)
+    for option in options:
+        key, _, value = option.partition("=")
+        if key not in OUTPUT_OPTIONS[kind]:
+            raise argparse.ArgumentTypeError(
+                "%s: unknown option %r (a %s takes %s)"
+                % (path, key, kind, ", ".join(OUTPUT_OPTIONS[kind]))
+            )
+        try:
+            spec[key] = _OPTION_TYPES[key](value)
+        except ValueError:
+            raise argparse.ArgumentTypeError("%s: bad %s %r" % (path, key, value))
+    return spec
+
+
+def run_job(argv, parser=None):
+    """
+    Render one video from its argv and return a JSON-able status dict.
+    Failures are reported rather than raised so batch callers can carry on
+    (``invalid`` tells a job that cannot succeed as given); anything printed
+    during the render goes to stderr.
+    """
+    parser = parser or build_parser()
+    started = time.perf_counter()
+    args = None
+    try:
+        with redirect_stdout(sys.stderr):
+            args = parse_job_args(parser, argv)
+            stats = render(args)
+    except (Exception, SystemExit) as exc:
+        traceback.print_exc(file=sys.stderr)
+        error = _job_error(exc)
+        return {"status": "error", "error": error, "invalid": _invalid(exc, args)}
+    result = {
+        "status": "done",
+        "output": args.output,
+        "seconds": round(time.perf_counter() - started, 3),
+        "encode_fps": stats["fps"],
+    }
+    if "subtitles" in stats:
+        result["subtitles"] = stats["subtitles"]
+    if "outputs" in stats:
+        result["outputs"] = stats["outputs"]
+    return result
+
+
+def _job_error(exc):
+    """The ``error`` of a job's status dict, for an exception it raised."""
+    if isinstance(exc, SystemExit):
+        return "invalid arguments (argparse output is on stderr)"
+    return str(exc) or repr(exc)
+
+
+def _invalid(exc, args=None):
+    """
+    Whether ``exc`` rejects the job's arguments or inputs (of the parsed
+    ``args``, when given), so that retrying the job is of no use.
+    """
+    if isinstance(exc, (SystemExit, ValueError)):
+        return True
+    if not isinstance(exc, OSError) or args is None:
+        return False
+    # A missing input file, whether reported as FileNotFoundError or, by
+    # MoviePy's readers, as a plain OSError
+    inputs = [args.intro, args.outro, args.audio, args.music, args.subtitles]
+    return any(path and not os.path.exists(path) for path in inputs)
+
+
+def preview_size(size, scale):
+    """``size`` scaled by ``scale``, rounded to even numbers (for yuv420p)."""
+    return tuple(max(2, int(round(v * scale / 2)) * 2) for v in size)
+
+
+def fit_size(size, bounds):
+    """``size`` scaled down, if it does not fit in ``bounds``, to fit in them."""
+    scale = min(1, bounds[0] / size[0], bounds[1] / size[1])
+    if scale == 1:
+        return tuple(size)
+    return tuple(min(v, b) for v, b in zip(preview_size(size, scale), bounds))
+
+
+def build_timeline(args, mix_audio=True, fit_canvas=False):
+    """
+    Build every clip of the video described by ``args`` without rendering.
+
+    Returns a dict with the concatenated ``clips`` (intro, layout, outro),
+    the full ``video`` clip, its soundtrack as an ``AudioMix`` (``audio``),
+    the ``overlays`` (caption track) the numpy engine blends on top, where
+    the layout clip is (``layout_index`` in ``clips``, ``layout_start``),
+    ``cuts``: timestamps where the picture changes scene (intro/outro edges
+    and every slide change), usable as segment boundaries, ``reusable``: the
+    intro, layout (one per slide when slides have a set length) and outro
+    spans with a fingerprint of all their picture depends on (``(name,
+    fingerprint, start, end)``), and
+    ``captions``: the (start, end) of every subtitle burnt in.
+
+    With ``args.preview`` every clip is scaled by ``PREVIEW_SCALE`` (the
+    layout as designed for the full size) and subtitles are left out. With
+    ``mix_audio=False`` (for a poster frame) the audio is not decoded and
+    ``audio`` is None. With ``fit_canvas`` (an ``--extra-output`` size) the
+    intro, outro and captions are scaled down to fit in ``args.width`` x
+    ``args.height``, so that the video is exactly that size.
+    """
+    scale = PREVIEW_SCALE if args.preview else None
+    bounds = (args.width, args.height) if fit_canvas else None
+    sizes = {}  # of the intro and outro, where scaled
+    num_images = len(args.images)
+    if num_images == 0:
+        raise ValueError("You must provide at least one main image.")
+
+    # ──────────────────────────── Timing logic ───────────────────────
+    with stage("assets"):
+        if args.audio:  # use voice‑over length
+            with AudioFileClip(args.audio) as vo_clip:
+                total_time = 10.0 if USE_FAKE_DATA else vo_clip.duration
+            remaining_time = max(total_time - INTRO_DURATION - OUTRO_DURATION, 0)
+            image_duration = remaining_time / num_images
+        else:  # fall back to explicit --duration
+            total_time = INTRO_DURATION + OUTRO_DURATION + args.duration
+            remaining_time = args.duration
+            image_duration = args.duration / num_images
+
+        # ───────────────────────── Build video track ─────────────────
+        clips = []
+
+        if args.intro:
+            # Probed, not opened: the intro is only decoded if its piece has
+            # to be encoded (see copyable_pieces and piece_keys)
+            # (scaled by ffmpeg while decoding)
+            native = tuple(load_info(args.intro)["video_size"])
+            if scale is not None:
+                sizes[args.intro] = preview_size(native, scale)
+            elif bounds is not None and fit_size(native, bounds) != native:
+                sizes[args.intro] = fit_size(native, bounds)
+            intro = lazy_video(args.intro, sizes.get(args.intro))
+            clips.append(intro.with_duration(INTRO_DURATION))
+        if args.outro:
+            outro = load_image(args.outro).with_duration(OUTRO_DURATION)
+            native = tuple(outro.size)
+            if scale is not None:
+                sizes[args.outro] = preview_size(native, scale)
+            elif bounds is not None and fit_size(native, bounds) != native:
+                sizes[args.outro] = fit_size(native, bounds)
+            if args.outro in sizes:
+                outro = outro.resized(sizes[args.outro])
+            outro = still(outro)
+
+    # Exact clip-relative times the layout will be asked for (frame i of the
+    # video is at i / fps), so the cursor can tabulate its animation
+    layout_start = INTRO_DURATION if args.intro else 0.0
+    layout_end = layout_start + remaining_time
+    frame_times = [
+        i / args.fps - layout_start for i in range(int(layout_end * args.fps) + 1)
+    ]
+    frame_times = [t for t in frame_times if 0 <= t < remaining_time]
+    if args.poster is not None:  # one frame: not worth tabulating
+        frame_times = None
+
+    width, height, design_size = args.width, args.height, None
+    if scale is not None:
+        width, height = preview_size((args.width, args.height), scale)
+        design_size = (args.width, args.height)
+
+    template = load_template(args.layout)
+    slideshow_images, static_images = split_images(template, args.images)
+    layout_kwargs = dict(
+        slideshow_images=slideshow_images,
+        static_images=static_images,
+        labels_list=args.labels.split(",") if args.labels else None,
+        video_width=width,
+        video_height=height,
+        total_duration=remaining_time,
+        click_sound_path=CLICK_SOUND,
+        image_cache=open_image_cache(args),
+        frame_times=frame_times,
+        layout=args.layout,
+        slideshow=dict(transition=args.transition) if args.transition else None,
+        design_size=design_size,
+    )
+    with stage("layout"):
+        if args.engine == "numpy":
+            grid_clip = LayoutFrameRenderer(
+                low_memory=args.low_memory, **layout_kwargs
+            ).to_clip()
+        else:
+            grid_clip = create_layout_slideshow(
+                flatten_static=not args.no_flatten_static, **layout_kwargs
+            )
+
+    layout_index = len(clips)
+    clips.append(grid_clip)
+
+    if args.outro:
+        clips.append(outro)
+
+    if args.engine == "numpy":
+        # write_timeline composes the clips itself: only the canvas size and
+        # duration are needed, not MoviePy's full-frame background and mask
+        video = VideoClip(duration=sum(clip.duration for clip in clips))
+        video.size = (max(c.size[0] for c in clips), max(c.size[1] for c in clips))
+    else:
+        video = concatenate_videoclips(clips, method="compose")
+
+    video = video.with_fps(args.fps)
+
+    # ──────────────── Overlay subtitles if provided ────────────────
+    overlays = []
+    captions = []
+    if args.subtitles and not args.preview:  # previews get a sidecar file
+        # Every cue pre-rendered once as a sprite (text over a rounded box),
+        # centered on the frame
+        with stage("subtitles"):
+            style = fit_style(video.size[0]) if fit_canvas else CAPTION_STYLE
+            track = CaptionTrack(args.subtitles, video.duration, style)
+        captions = track.times
+
+        # Composite subtitles over the main video (the numpy engine, and
+        # pieces drawn over a cached layout, blend them while writing frames)
+        overlays.append(track)
+        if args.engine != "numpy":
+            video = CompositeVideoClip([video, track.to_clip()])
+
+    # ─────────────────────────── Audio mixing ────────────────────────
+    # Sources are decoded here; the mix itself is computed while encoding
+    audio = None
+    if mix_audio:
+        with stage("audio"):
+            audio = AudioMix(video.duration)
+
+            # intro soundtrack (if any) and the cursor clicks
+            if args.intro and load_info(args.intro)["audio_found"]:
+                audio.add(args.intro, duration=INTRO_DURATION)
+            for t in grid_clip.click_times:
+                audio.add(CLICK_SOUND, start=layout_start + t)
+
+            # voice‑over at user‑controlled gain (full level by default)
+            if args.audio:
+                audio.add(args.audio, gain=args.audio_volume)
+
+            # background music at user‑controlled gain
+            if args.music:
+                audio.add(args.music, gain=args.music_volume)
+
+    show = slideshow_layer(
+        template, width, height, layout_kwargs["slideshow"], design_size
+    )
+    slide_duration, schedule = schedule_slides(show, slideshow_images, remaining_time)
+    cuts = [0.0] + [layout_start + i * image_duration for i in range(num_images)]
+    cuts += [layout_start + start for _, start, _, _, _ in schedule]
+    cuts.append(layout_start + remaining_time)
+
+    # What the picture of each span depends on. Changing only the voice-over
+    # or the music keeps all of them, so their encoded pieces are reused.
+    # Files are only hashed for the render cache; a missing image (left out
+    # of the layout) is keyed as None
+    def hashed(path):
+        if args.no_render_cache or not os.path.exists(path):
+            return None
+        return file_digest(path)
+
+    def source(path):
+        digest = hashed(path)
+        if scale is not None:
+            return [digest, scale]
+        return digest if path not in sizes else [digest, list(sizes[path])]
+
+    reusable = []
+    if args.intro:
+        reusable.append(("intro", source(args.intro), 0.0, INTRO_DURATION))
+    layout = dict(
+        template=template["digest"],
+        images=[hashed(path) for path in args.images],
+        labels=layout_kwargs["labels_list"],
+        transition=args.transition,
+        size=[width, height],
+        start=layout_start,
+        duration=remaining_time,
+        engine=args.engine,
+    )
+    if design_size is not None:
+        layout["design_size"] = list(design_size)
+    if schedule and "slide_duration" in show:
+        # Slides of a set length are timed the same whatever the video's
+        # length: the stretch of each slide is keyed by the slides it shows
+        # instead of the duration, so a longer or shorter voice-over reuses
+        # every piece but the last ones
+        del layout["duration"]
+        layout["slide_duration"] = slide_duration
+        starts = [start for _, start, _, _, _ in schedule] + [remaining_time]
+        for t0, t1 in zip(starts, starts[1:]):
+            shown = [
+                [hashed(path), start, duration, fade_in, fade_out]
+                for path, start, duration, fade_in, fade_out in schedule
+                if start < t1 and start + duration > t0
+            ]
+            stretch = dict(layout, slides=shown, stretch=[t0, t1])
+            reusable.append(("layout", stretch, layout_start + t0, layout_start + t1))
+    else:
+        reusable.append(("layout", layout, layout_start, layout_end))
+    if args.outro:
+        reusable.append(("outro", source(args.outro), layout_end, video.duration))
+    return {
+        "clips": clips,
+        "video": video,
+        "audio": audio,
+        "overlays": overlays,
+        "layout_index": layout_index,
+        "layout_start": layout_start,
+        "cuts": sorted(set(c for c in cuts if c < video.duration)),
+        "reusable": reusable,
+        "captions": captions,
+    }
+
+
+def encode_params(args):
+    """ffmpeg/x264 settings shared by full and segmented renders."""
+    params = profile_params(args.profile, args.pix_fmt)
+    if args.vfr:
+        params["vfr"] = True
+    return params
+
+
+# ─────────────────────────── Render ──────────────────────────────
+def render(args):
+    """
+    Render one video as described by the parsed command line ``args``, under
+    the profiler if one is asked for, in its own ``JobWorkspace``: the output
+    appears, complete, only once the render succeeded. Returns the frame
+    count and encode speed (``write_timeline``'s stats), the path of the
+    sidecar ``subtitles`` of a preview, and the ``--extra-output`` paths
+    (``outputs``).
+    """
+    started = time.perf_counter()
+    with profiled(args.profiler, profiler_output(args)):
+        with JobWorkspace(args.output, args.workspace_root) as workspace:
+            if args.poster is not None:
+                stats = render_poster(args, workspace)
+            elif args.extra_outputs:
+                stats = render_outputs(args, workspace)
+            else:
+                stats = _render(args, workspace)
+            if args.preview and args.subtitles and args.poster is None:
+                write_webvtt(args.subtitles, workspace.sidecar(".vtt"))
+                stats["subtitles"] = os.path.splitext(args.output)[0] + ".vtt"
+    instrumentation.emit(
+        "render_end",
+        output=args.output,
+        seconds=round(time.perf_counter() - started, 3),
+        frames=stats["frames"],
+        fps=stats["fps"],
+        peak_rss_mb=instrumentation.peak_rss_mb(),
+        ffmpeg_peak_rss_mb=instrumentation.peak_rss_mb(children=True),
+    )
+    return stats
+
+
+def profiler_output(args):
+    if args.profiler_output or args.profiler is None:
+        return args.profiler_output
+    suffix = ".html" if args.profiler == "pyinstrument" else ".prof"
+    return os.path.splitext(args.output)[0] + suffix
+
+
+def _render(args, workspace):
+    timeline = build_timeline(args)
+    cache = open_render_cache(args)
+    copyable = copyable_pieces(args, timeline)
+    total_frames = int(timeline["video"].duration * args.fps)
+    with stage("encode"):
+        if args.segments > 1 or cache is not None or copyable:
+            return render_pieces(args, timeline, workspace, cache, copyable)
+
+        # Both engines go through write_timeline so the audio mix is streamed
+        # into the encoder
+        segments, overlays = _timeline_layers(args, timeline)
+        return write_timeline(
+            segments,
+            workspace.output,
+            fps=args.fps,
+            audio=timeline["audio"],
+            overlays=overlays,
+            queue_size=args.encode_queue,
+            progress=Progress(total_frames),
+            **encode_params(args),
         )
 
-        # Get text dimensions
-        w, h = text_clip.size
 
-        # Create rounded rectangle background using PIL
-        bg_width = w + (padding * 2)
-        bg_height = h + (padding * 2)
+def render_outputs(args, workspace):
+    """
+    Render ``--output`` and every ``--extra-output`` in one pass per
+    distinct frame size: the timeline of each size is built and its frames
+    rendered once, and a single ffmpeg process makes every encode, still
+    and animation cut from them (``FrameEncoder``'s ``extra_outputs``).
+    At a size other than ``--output``'s, the intro, outro and captions are
+    scaled down to fit (``build_timeline``'s ``fit_canvas``) and the frames
+    are checked to be that size. The soundtrack is mixed once for all sizes.
+    """
+    started = time.perf_counter()
+    main = (args.width, args.height)
+    groups = {main: [dict(path=args.output, kind="video")]}
+    for spec in args.extra_outputs:
+        groups.setdefault(spec.get("size", main), []).append(spec)
 
-        img = Image.new("RGBA", (bg_width, bg_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        draw.rounded_rectangle(
-            [(0, 0), (bg_width - 1, bg_height - 1)],
-            radius=corner_radius,
-            fill=(0, 0, 0, 200),  # Semi-transparent black (200/255 opacity)
+    audio = progress = None
+    done = 0
+    for size, specs in groups.items():
+        # Cut from the first full-size video of the size (validated by
+        # parse_job_args), encoded with the main output's settings
+        primary = next(s for s in specs if s["kind"] == "video" and "scale" not in s)
+        group_args = argparse.Namespace(**vars(args))
+        group_args.width, group_args.height = size
+        group_args.profile = primary.get("profile", args.profile)
+        timeline = build_timeline(
+            group_args, mix_audio=audio is None, fit_canvas=size != main
         )
+        if size != main and tuple(timeline["video"].size) != size:
+            raise ValueError(
+                "--extra-output: the %dx%d video would be %dx%d"
+                % (size + tuple(timeline["video"].size))
+            )
+        if audio is None:
+            audio = timeline["audio"]
+        total_frames = int(timeline["video"].duration * args.fps)
+        if progress is None:
+            progress = Progress(total_frames * len(groups))
+
+        extras = [
+            _extra_output(args, workspace, timeline, spec, total_frames)
+            for spec in specs
+            if spec is not primary
+        ]
+        filename = workspace.output
+        if size != main:
+            filename = workspace.extra(primary["path"])
+        segments, overlays = _timeline_layers(args, timeline)
+        with stage("encode"):
+            write_timeline(
+                segments,
+                filename,
+                fps=args.fps,
+                audio=audio,
+                overlays=overlays,
+                queue_size=args.encode_queue,
+                progress=lambda frames, done=done: progress(done + frames),
+                extra_outputs=extras,
+                **encode_params(group_args),
+            )
+        done += total_frames
+
+    fps = done / (time.perf_counter() - started)
+    outputs = [spec["path"] for spec in args.extra_outputs]
+    print(
+        "Rendered %d frames for %d outputs (%.1f fps)" % (done, len(outputs) + 1, fps),
+        file=sys.stderr,
+    )
+    return {"frames": done, "fps": round(fps, 2), "outputs": outputs}
+
+
+def _extra_output(args, workspace, timeline, spec, total_frames):
+    """The ``FrameEncoder`` extra output writing ``spec`` (``output_spec``)."""
+    path = workspace.extra(spec["path"])
+    if spec["kind"] == "video":
+        size = None
+        if "scale" in spec:
+            size = preview_size(timeline["video"].size, spec["scale"])
+        params = profile_params(spec.get("profile", args.profile), args.pix_fmt)
+        return video_output(path, size, **params)
+    if spec["kind"] == "still":
+        t = spec.get("at", timeline["video"].duration / 2)
+        return still_output(path, min(frame_at(t, args.fps), total_frames - 1))
+    start = spec.get("start", timeline["layout_start"])
+    first = min(frame_at(start, args.fps), total_frames - 1)
+    duration = spec.get("duration", ANIMATION_DURATION)
+    stop = min(first + max(frame_at(duration, args.fps), 1), total_frames)
+    return animation_output(
+        path,
+        first,
+        stop,
+        spec.get("fps", ANIMATION_FPS),
+        spec.get("width", ANIMATION_WIDTH),
+    )
+
+
+def render_poster(args, workspace):
+    """
+    Save the frame at ``args.poster`` seconds (clamped to the last frame) as
+    an image, without encoding, or even decoding, the rest of the video.
+    """
+    started = time.perf_counter()
+    timeline = build_timeline(args, mix_audio=False)
+    t = min(args.poster, (int(timeline["video"].duration * args.fps) - 1) / args.fps)
+    with stage("poster"):
+        if args.engine == "numpy":
+            canvas = TimelineCanvas(timeline["clips"], timeline["overlays"])
+            frame = canvas.render(max(t, 0.0))
+        else:
+            frame = timeline["video"].get_frame(max(t, 0.0))
+        Image.fromarray(np.asarray(frame, np.uint8)).save(workspace.output)
+    return {"frames": 1, "fps": round(1 / (time.perf_counter() - started), 2)}
+
+
+def _timeline_layers(args, timeline):
+    """The segments and overlays ``write_timeline`` draws for the engine."""
+    if args.engine == "numpy":
+        return timeline["clips"], timeline["overlays"]
+    return [timeline["video"]], []
 
-        # Convert PIL image to ImageClip
-        bg_clip = ImageClip(np.array(img))
 
-        # Composite text over rounded background
-        return CompositeVideoClip(
-            [bg_clip, text_clip.with_position("center")], size=(bg_width, bg_height)
+def open_render_cache(args):
+    if args.no_render_cache:
+        return None
+    return RenderCache(args.cache_dir, int(args.cache_size_mb * 1024 * 1024))
+
+
+def open_image_cache(args):
+    """Pre-resized images live next to the video pieces, with their own cap."""
+    if args.no_render_cache:
+        return None
+    return RenderCache(
+        os.path.join(args.cache_dir, "images"),
+        int(args.cache_size_mb * 1024 * 1024),
+        suffix=".npy",
+    )
+
+
+def reusable_spans(args, timeline):
+    """Map the frame range of every reusable span to its name and fingerprint."""
+    total_frames = int(timeline["video"].duration * args.fps)
+    spans = {}
+    for name, fingerprint, start, end in timeline["reusable"]:
+        first = frame_at(start, args.fps)
+        stop = min(frame_at(end, args.fps), total_frames)
+        if first < stop:
+            spans[(first, stop)] = (name, fingerprint)
+    return spans
+
+
+def piece_keys(args, timeline, cache, spans, frames):
+    """
+    Render cache keys ``(key, base_key)`` of the piece covering ``frames``.
+
+    ``key`` names the encoded piece. It covers the span's fingerprint and all
+    that shapes the encoded bytes (canvas size, fps, frame range, encoder
+    settings), and is None when a subtitle overlaps the piece: its picture
+    then depends on this video's captions, which are drawn over the piece's
+    frames without them. For the layout, ``base_key`` names those frames,
+    kept losslessly so that only the captions are drawn on a later render;
+    the intro and outro need no such copy, their source being cheaper to
+    decode than it. Both are None without a cache or outside the reusable
+    spans.
+    """
+    if cache is None:
+        return None, None
+    for (first, stop), (name, fingerprint) in spans.items():
+        if first <= frames[0] and frames[1] <= stop:
+            break
+    else:
+        return None, None
+    params = dict(
+        piece=name,
+        source=fingerprint,
+        size=list(timeline["video"].size),
+        fps=args.fps,
+        offset=frames[0] - first,
+        frames=frames[1] - frames[0],
+    )
+    if not _captioned(args, timeline, frames):
+        return cache.key(encode=_video_params(args), **params), None
+    if name == "layout":
+        return None, cache.key(base="libx264rgb-qp0", **params)
+    return None, None
+
+
+def _captioned(args, timeline, frames):
+    """Whether a subtitle shows during the frame range ``frames``."""
+    t0, t1 = frames[0] / args.fps, frames[1] / args.fps
+    return any(a < t1 and b > t0 for a, b in timeline["captions"])
+
+
+def copyable_pieces(args, timeline):
+    """
+    Map the frame range of the intro piece to its source file when the
+    source could be stream-copied into the output instead of decoded and
+    re-encoded: an H.264 video at the canvas size and output fps, with no
+    subtitle over it. Whether its parameter sets match the encoder's is
+    only known once a piece has been encoded (see ``render_pieces``).
+    """
+    video = timeline["video"]
+    pieces = {}
+    for name, _, start, end in timeline["reusable"]:
+        if name != "intro":
+            continue
+        info = load_info(args.intro)
+        if (
+            info.get("video_codec_name") != "h264"
+            or tuple(info["video_size"]) != tuple(video.size)
+            or info["video_fps"] != args.fps
+            or any(a < end and b > start for a, b in timeline["captions"])
+        ):
+            continue
+        pieces[(frame_at(start, args.fps), frame_at(end, args.fps))] = args.intro
+    return pieces
+
+
+def _video_params(args):
+    """``encode_params`` without the audio settings, for video-only pieces."""
+    params = encode_params(args)
+    params.pop("audio_codec")
+    return params
+
+
+def _encode_piece(args, timeline, piece, progress=None):
+    """
+    Encode ``piece`` (see ``render_pieces``). Captioned pieces draw the
+    captions over the clips themselves, whatever the engine: over the
+    decoded base of a layout piece (``base_cached``), which stands in for
+    the clip the piece is cut from, while saving that base, or over the
+    intro and outro as decoded from their source.
+    """
+    base = None
+    if piece["base"] is None and not _captioned(args, timeline, piece["frames"]):
+        segments, overlays = _timeline_layers(args, timeline)
+    else:
+        segments, overlays = list(timeline["clips"]), timeline["overlays"]
+        if piece["base"] is not None and piece["base_cached"]:
+            # Base frame j is frame first + j of the video
+            k = timeline["layout_index"]
+            offset = piece["frames"][0] / args.fps - timeline["layout_start"]
+            base = VideoFileClip(piece["base"])
+            segments[k] = base.time_transform(lambda t: t - offset).with_duration(
+                segments[k].duration
+            )
+    try:
+        write_timeline(
+            segments,
+            piece["path"],
+            fps=args.fps,
+            overlays=overlays,
+            frames=piece["frames"],
+            queue_size=args.encode_queue,
+            progress=progress,
+            base_filename=(
+                piece["base"]
+                if piece["base"] is not None and not piece["base_cached"]
+                else None
+            ),
+            **_video_params(args),
         )
+    finally:
+        if base is not None:
+            base.close()
+    return piece["path"]
+
+
+def _render_segment(args, piece):
+    """Worker side of --segments: rebuild the timeline, encode one piece."""
+    instrumentation.mute()  # the parent reports progress
+    with redirect_stdout(sys.stderr):
+        return _encode_piece(args, build_timeline(args), piece)
 
-    # Load and generate the subtitles clip
-    subs = SubtitlesClip(args.subtitles, make_textclip=make_text_clip_rounded)
 
-    # Position subtitles at the bottom with some margin from edge
-    subs = subs.with_position(("center"))
+def render_pieces(args, timeline, workspace, cache=None, copyable=None):
+    """
+    Render the timeline as independently encoded pieces in ``workspace``,
+    then join them with ffmpeg's concat demuxer (stream copy) into its
+    output while muxing in the audio mix.
 
-    # Composite subtitles over the main video
-    video = CompositeVideoClip([video, subs.with_duration(video.duration)])
+    Pieces start at scene cuts (intro end, slide changes, outro start), and
+    every piece begins with its own keyframe, so they concatenate cleanly.
+    Pieces of the intro, layout and outro are taken from the render cache
+    when present and stored there after encoding otherwise (see
+    ``piece_keys``), so a video differing only in its audio is a concat of
+    cached pieces plus the new mix. A piece listed in ``copyable`` is first
+    trimmed from its source by stream copy, and kept if its SPS/PPS turn out
+    identical to the encoded pieces'. With ``args.segments > 1`` the
+    remaining pieces are encoded by parallel processes; each worker rebuilds
+    the timeline itself, as clips backed by an ffmpeg reader cannot be shared
+    across processes.
+    """
+    started = time.perf_counter()
+    copyable = copyable or {}
+    video = timeline["video"]
+    total_frames = int(video.duration * args.fps)
+    spans = reusable_spans(args, timeline)
+    bounds = plan_segments(timeline["cuts"], args.fps, total_frames, args.segments)
+    bounds = sorted(set(bounds).union(*spans, *copyable))
 
-# ─────────────────────────── Audio mixing ────────────────────────
-audio_tracks = []
+    paths, todo = [], []
+    for i, frames in enumerate(zip(bounds, bounds[1:])):
+        path = workspace.path("segment-%03d.mp4" % i)
+        paths.append(path)
+        key, base_key = piece_keys(args, timeline, cache, spans, frames)
+        if key is not None and cache.fetch(key, path):
+            continue
+        piece = dict(frames=frames, path=path, key=key, base=None)
+        if base_key is not None:
+            piece["base"] = workspace.path("base-%03d.mp4" % i)
+            piece["base_key"] = base_key
+            piece["base_cached"] = cache.fetch(base_key, piece["base"])
+        todo.append(piece)
 
-# voice‑over always full level
-if vo_clip:
-    audio_tracks.append(vo_clip.with_duration(video.duration))
+    copied = []
+    for piece in todo:
+        first, stop = piece["frames"]
+        source = copyable.get(piece["frames"])
+        if source is not None and copy_frames(source, stop - first, piece["path"]):
+            copied.append(piece)
+    todo = [piece for piece in todo if piece not in copied]
 
-# background music at user‑controlled gain
-if args.music:
-    bgm = (
-        AudioFileClip(args.music)
-        .with_effects([afx.MultiplyVolume(args.music_volume)])
-        .with_duration(video.duration)
+    # Frames of cached and copied pieces count as done from the start
+    progress = Progress(total_frames)
+    done = total_frames - sum(piece["frames"][1] - piece["frames"][0] for piece in todo)
+    progress(done)
+    if args.segments > 1 and len(todo) > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with ProcessPoolExecutor(
+            max_workers=min(len(todo), args.segments), mp_context=context
+        ) as pool:
+            futures = {
+                pool.submit(_render_segment, args, piece): piece["frames"]
+                for piece in todo
+            }
+            for future in as_completed(futures):
+                future.result()
+                first, stop = futures[future]
+                done += stop - first
+                progress(done)
+    else:
+        for piece in todo:
+            _encode_piece(
+                args,
+                timeline,
+                piece,
+                progress=lambda frames, done=done: progress(done + frames),
+            )
+            done += piece["frames"][1] - piece["frames"][0]
+
+    if copied:
+        copied_paths = {piece["path"] for piece in copied}
+        reference = parameter_sets(
+            next(path for path in paths if path not in copied_paths)
+        )
+        for piece in copied:
+            if parameter_sets(piece["path"]) == reference:
+                print("Stream-copied piece %s-%s" % piece["frames"], file=sys.stderr)
+            else:
+                _encode_piece(args, timeline, piece)
+        todo += copied
+
+    for piece in todo:
+        if piece["key"] is not None:
+            cache.store(piece["key"], piece["path"])
+        if piece["base"] is not None and not piece["base_cached"]:
+            cache.store(piece["base_key"], piece["base"])
+
+    durations = [(stop - first) / args.fps for first, stop in zip(bounds, bounds[1:])]
+    concat_segments(
+        paths,
+        workspace.output,
+        audio=timeline["audio"],
+        audio_codec=encode_params(args)["audio_codec"],
+        durations=durations,
+    )
+    fps = total_frames / (time.perf_counter() - started)
+    print(
+        "Rendered %d frames in %d pieces (%.1f fps)"
+        % (total_frames, len(bounds) - 1, fps),
+        file=sys.stderr,
     )
-    audio_tracks.append(bgm)
+    return {"frames": total_frames, "fps": round(fps, 2)}
 
-if audio_tracks:
-    if video.audio:  # <- bring the cursor clicks along
-        audio_tracks.insert(0, video.audio)
-    final_audio = CompositeAudioClip(audio_tracks)
-    video = video.with_audio(final_audio)
 
-# ─────────────────────────── Render ──────────────────────────────
-# video.write_videofile(
-#     args.output,
-#     codec="libx264",
-#     preset="ultrafast",
-#     audio_codec="aac",
-#     fps=args.fps,
-#     bitrate="4000k",
-#     temp_audiofile="temp-audio.m4a",
-#     remove_temp=True,
-# )
-video.write_videofile(
-    args.output,
-    codec="libx264",
-    preset="ultrafast",
-    audio_codec="aac",
-    fps=args.fps,
-    bitrate="1000k",  # Very low bitrate
-    threads=0,
-    temp_audiofile="temp-audio.m4v",  # Different temp format
-    remove_temp=True,
-    ffmpeg_params=[
-        "-crf",
-        "35",  # Much higher CRF
-        "-g",
-        "60",  # Larger GOP size
-        "-bf",
-        "0",  # No B-frames
-        "-refs",
-        "1",  # Single reference frame
-        "-me_method",
-        "dia",  # Diamond motion estimation (fastest)
-        "-subq",
-        "1",  # Lowest subpixel refinement
-        "-trellis",
-        "0",  # Disable trellis quantization
-        "-movflags",
-        "+faststart",
-    ],
-)
+# ─────────────────────────── Batch mode ──────────────────────────
+def load_manifest(path):
+    """
+    Read a batch manifest: either a list of jobs or an object with optional
+    ``common_args`` prepended to every job's ``args``::
+
+        {"common_args": ["--intro", "public/intro.mp4", "--fps", "24"],
+         "profile": "social",
+         "jobs": [{"id": "a-rachel", "args": ["--output", "a.mp4", ...]},
+                  {"id": "b-adam", "profile": "archive", "args": [...]}]}
+
+    ``profile`` picks the encoder profile of every job, or of one job.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    common = manifest.get("common_args", [])
+    jobs = []
+    for i, job in enumerate(manifest["jobs"]):
+        args = common + job["args"]
+        profile = job.get("profile", manifest.get("profile"))
+        if profile is not None:
+            args += ["--profile", profile]
+        jobs.append({"id": str(job.get("id", i)), "args": args})
+    return jobs
+
+
+def _batch_job(job):
+    instrumentation.bind(job=job["id"])
+    return {"id": job["id"], **run_job(job["args"])}
+
+
+def render_batch(jobs, max_workers=None):
+    """
+    Render ``jobs`` in a process pool, printing one JSON result line per job
+    as it finishes. Returns the number of failed jobs.
+
+    Decoded still images shared by the jobs (outro cards) are loaded before
+    the pool forks so workers share them copy-on-write. Readers backed by an
+    ffmpeg subprocess (intro video, audio) are opened per worker instead:
+    a pipe cannot be shared between processes. A job whose arguments are
+    invalid, or whose outro cannot be loaded, fails without being started.
+    """
+    parser = build_parser()
+    failed = 0
+    runnable = []
+    for job in jobs:
+        args = None
+        try:
+            with redirect_stdout(sys.stderr):
+                args = parse_job_args(parser, job["args"])
+                if args.outro:
+                    load_image(args.outro)
+        except (Exception, SystemExit) as exc:
+            traceback.print_exc(file=sys.stderr)
+            failed += 1
+            result = {"id": job["id"], "status": "error", "error": _job_error(exc)}
+            result["invalid"] = _invalid(exc, args)
+            print(json.dumps(result), flush=True)
+            continue
+        runnable.append(job)
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if "fork" in methods else None
+    with ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(), mp_context=context
+    ) as pool:
+        futures = {pool.submit(_batch_job, job): job for job in runnable}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:  # worker died (OOM kill, segfault, ...)
+                result = {"id": futures[future]["id"], "status": "error"}
+                result["error"] = str(exc) or repr(exc)
+            failed += result["status"] != "done"
+            print(json.dumps(result), flush=True)
+    return failed
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    instrumentation.open_events(args.events_fd)
+    interrupt_on_sigterm()
+    if args.manifest:
+        sys.exit(1 if render_batch(load_manifest(args.manifest), args.jobs) else 0)
+    render(parse_job_args(parser, argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""
+Direct NumPy frame renderer for the layout templates.
+
+Instead of walking MoviePy's CompositeVideoClip tree on every frame, the
+layout is compiled once (flattened background, pre-resized slide bitmaps,
+cursor sprites) and each frame is produced by a few vectorized alpha blends
+into a reused buffer. ``write_timeline`` then pipes the raw RGB frames of the
+intro / slideshow / outro segments straight into ffmpeg's stdin.
+
+Clips and overlays can declare what they show at a time ``t`` with a
+``frame_state(t)`` method (equal values, identical pixels): runs of frames
+whose state does not change, like the outro card or a layout between two
+transitions, are then rendered and sent to the encoder once (see
+``plan_holds``).
+"""
+from collections import OrderedDict
+from contextlib import ExitStack
+
+import numpy as np
+import proglog
+
+from moviepy import CompositeAudioClip, CompositeVideoClip, VideoClip
+from moviepy.tools import compute_position
+
+from scripts.blit import blend_into, to_alpha
+from scripts.encoder import FrameEncoder
+from scripts.function import CursorOverlay, flatten_static_clips
+from scripts.images import fit_images
+from scripts.render_cache import RenderCache
+from scripts.templates import DEFAULT_LAYOUT, build_layers, load_template, static_key
+from scripts.transitions import SlideTrack, slide_from_clip
+
+# Compiled static layers kept in memory; a worker's recent layouts and sizes
+PLAN_MEMO_SIZE = 8
+
+_plans = OrderedDict()
+
+
+def _unchanging(t):
+    return ()
+
+
+def still(clip):
+    """Declare that ``clip`` shows the same picture throughout (an image)."""
+    clip.frame_state = _unchanging
+    return clip
+
+
+def blend_clip(dst, clip, t):
+    """Blend a MoviePy clip (frame + mask, at its own position) onto ``dst``."""
+    if not clip.is_playing(t):
+        return
+    ct = t - clip.start
+    frame = clip.get_frame(ct)
+    alpha = to_alpha(clip.mask.get_frame(ct)) if clip.mask is not None else None
+    size = frame.shape[1], frame.shape[0]
+    x, y = compute_position(size, dst.shape[1::-1], clip.pos(ct), clip.relative_pos)
+    blend_into(dst, frame.astype(np.uint8), alpha, x, y)
+
+
+def compile_plan(
+    template,
+    slideshow_images,
+    static_images,
+    labels,
+    width,
+    height,
+    total_duration,
+    image_cache=None,
+    low_memory=False,
+    slideshow=None,
+    design_size=None,
+):
+    """
+    Compile a layout template (see ``scripts.templates``) into a render plan:
+    the layers of ``build_layers`` with the static ones flattened into
+    ``static``, one uint8 array holding the RGB background, followed, when
+    static layers cover the slideshow, by the RGB and alpha of that overlay.
+
+    The flattened layers depend only on the template, size, static images
+    and labels, so they are kept in memory across jobs and, given an
+    ``image_cache``, on disk (memory-mapped back in ``low_memory`` mode);
+    when found, the static layers are not even built.
+    """
+    labels = template.get("labels", []) if labels is None else labels
+    key = RenderCache.key(
+        plan=static_key(template, static_images, labels, width, height, design_size)
+    )
+    static = _plans.get(key)
+    if static is not None:
+        _plans.move_to_end(key)
+    elif image_cache is not None:
+        entry = image_cache.lookup(key)
+        try:
+            if entry is not None:
+                static = np.load(entry, mmap_mode="r" if low_memory else None)
+        except (FileNotFoundError, ValueError):  # evicted or truncated
+            pass
+
+    plan = build_layers(
+        template,
+        slideshow_images,
+        static_images,
+        labels,
+        width,
+        height,
+        total_duration,
+        image_cache,
+        low_memory,
+        static=static is None,
+        slideshow=slideshow,
+        design_size=design_size,
+    )
+    if static is None:
+        size = (width, height)
+        background = flatten_static_clips(plan["below"], size, total_duration)
+        static = np.asarray(background[0].get_frame(0), np.uint8)
+        if plan["above"]:
+            overlay = CompositeVideoClip(plan["above"], size=size)
+            alpha = to_alpha(overlay.mask.get_frame(0))
+            static = np.dstack([static, overlay.get_frame(0), alpha[:, :, 0]])
+        static = np.ascontiguousarray(static, np.uint8)
+        if image_cache is not None:
+            image_cache.write(key, lambda f: np.save(f, static))
+    if not low_memory:
+        _plans[key] = static
+        while len(_plans) > PLAN_MEMO_SIZE:
+            _plans.popitem(last=False)
+    plan["static"] = static
+    return plan
+
+
+class LayoutFrameRenderer:
+    """
+    Renders ``create_layout_slideshow`` frames without MoviePy compositing.
+
+    Takes the same arguments as ``create_layout_slideshow`` and produces the
+    same picture: slides fade in from black over the layout's fade (the last
+    one, or all of them, also fade out) and the cursor glides between its
+    targets with a short press animation at the start of every slot. The
+    layout is compiled once by ``compile_plan``; a frame is the background
+    copied in, the slides showing (a ``SlideTrack``) and the cursor.
+
+    With ``low_memory``, memory stays flat whatever the number of slides: a
+    slide is decoded (or memory-mapped from the image cache) when it comes
+    into view and dropped when it leaves.
+    """
+
+    def __init__(
+        self,
+        slideshow_images,
+        static_images,
+        labels_list,
+        video_width,
+        video_height,
+        total_duration,
+        transition_duration=None,
+        click_sound_path="public/Mouse.mp3",
+        cursor_icon_path="public/cursor.png",
+        image_cache=None,
+        frame_times=None,
+        low_memory=False,
+        layout=DEFAULT_LAYOUT,
+        slideshow=None,
+        design_size=None,
+    ):
+        self.size = (video_width, video_height)
+        self.duration = total_duration
+
+        plan = compile_plan(
+            load_template(layout),
+            slideshow_images,
+            static_images,
+            labels_list,
+            video_width,
+            video_height,
+            total_duration,
+            image_cache,
+            low_memory,
+            slideshow,
+            design_size,
+        )
+        self.image_cache = image_cache
+        self.slide_duration = plan["slide_duration"]
+        self.positions = plan["positions"]
+        self.transition = (
+            plan["fade"] if transition_duration is None else transition_duration
+        )
+
+        static = plan["static"]
+        self.background = static[:, :, :3]
+        self.overlay = None
+        if static.shape[2] > 3:
+            self.overlay = static[:, :, 3:6], static[:, :, 6:].astype(np.uint16)
+        self.buffer = np.empty(self.background.shape, np.uint8)
+        self._rendered = None
+
+        slides = []
+        for clip, (fade_in, fade_out) in zip(plan["slides"], plan["fades"]):
+            if low_memory:  # a LazySlide
+                slides.append(
+                    dict(
+                        start=clip.start,
+                        end=clip.start + clip.duration,
+                        fade_in=fade_in,
+                        fade_out=fade_out,
+                        source=clip,
+                        image=None,
+                        alpha=None,
+                        xy=None,
+                    )
+                )
+            else:
+                slides.append(slide_from_clip(clip, fade_in, fade_out))
+        self.track = SlideTrack(
+            slides,
+            self.background,
+            plan["slot"],
+            plan["transition"] or "fade",
+            self.transition,
+            load=self._load_slide,
+            release=low_memory,
+        )
+
+        self.cursor = None
+        self.click_clips = []
+        if plan["cursor_size"] is not None:
+            self.cursor = CursorOverlay(
+                self.positions, self.slide_duration, total_duration, plan["cursor_size"]
+            )
+            if frame_times is not None:
+                self.cursor.precompute(frame_times)
+            self.click_clips = self.cursor.click_clips(click_sound_path)
+
+    def _load_slide(self, slide):
+        source = slide["source"]
+        image = fit_images([(source.path, source.box)], self.image_cache, True)[0]
+        alpha = None
+        if image.ndim == 3 and image.shape[2] == 4:  # as ImageClip splits it
+            alpha = to_alpha(1.0 * image[:, :, 3] / 255)
+            image = image[:, :, :3]
+        x, y, w, h = source.slot
+        slide["image"], slide["alpha"] = image, alpha
+        slide["xy"] = (x + (w - image.shape[1]) // 2, y + (h - image.shape[0]) // 2)
+
+    def state(self, t):
+        """What the frame at ``t`` shows: the slides' and the cursor's state."""
+        return (
+            self.track.state(t),
+            self.cursor.state(t) if self.cursor is not None else None,
+        )
+
+    def render(self, t):
+        """
+        Return the frame at time ``t``. The buffer is reused between calls,
+        and left as it is when the slides and cursor look the same as for
+        the previous call (e.g. between transitions of a layout without a
+        cursor).
+        """
+        state = self.state(t)
+        out = self.buffer
+        if state == self._rendered:
+            return out
+        np.copyto(out, self.background)
+        self.track.draw(out, t, state[0])
+        if self.overlay is not None:
+            blend_into(out, self.overlay[0], self.overlay[1], 0, 0)
+        if self.cursor is not None:
+            self.cursor.draw(out, t)
+        self._rendered = state
+        return out
+
+    def to_clip(self):
+        """
+        Wrap the renderer as a plain VideoClip carrying the click track; its
+        ``click_times`` attribute lists when the clicks start, and its
+        ``frame_state`` is the renderer's ``state``.
+        """
+        clip = VideoClip(frame_function=self.render, duration=self.duration)
+        if self.click_clips:
+            clip = clip.with_audio(CompositeAudioClip(self.click_clips))
+        clip.click_times = self.cursor.starts.tolist() if self.cursor else []
+        clip.frame_state = self.state
+        return clip
+
+
+class TimelineCanvas:
+    """
+    Clips played back to back, each centered on a black canvas the size of
+    the largest one (like ``concatenate_videoclips(method="compose")``), with
+    ``overlays`` blended on top: MoviePy clips, or objects drawing themselves
+    with ``draw(frame, t)``.
+    """
+
+    def __init__(self, segments, overlays=()):
+        self.segments = segments
+        self.overlays = overlays
+        self.size = (
+            max(clip.size[0] for clip in segments),
+            max(clip.size[1] for clip in segments),
+        )
+        self.canvas = np.zeros(self.size[::-1] + (3,), np.uint8)
+        self.starts = np.cumsum([0] + [clip.duration for clip in segments])
+        self.duration = self.starts[-1]
+
+    def _locate(self, t):
+        """Index of the segment playing at ``t``, and the time in it."""
+        k = int(np.searchsorted(self.starts, t, side="right")) - 1
+        k = min(k, len(self.segments) - 1)
+        return k, t - self.starts[k]
+
+    def state(self, t):
+        """
+        What the frame at ``t`` shows, equal for identical frames, or None
+        if a segment or overlay shown has no ``frame_state``.
+        """
+        k, ct = self._locate(t)
+        clip = self.segments[k]
+        if not hasattr(clip, "frame_state"):
+            return None
+        state = [k, clip.frame_state(ct)]
+        for overlay in self.overlays:
+            if not hasattr(overlay, "frame_state"):
+                return None
+            state.append(overlay.frame_state(t))
+        return tuple(state)
+
+    def render(self, t, overlays=True):
+        """
+        Return the frame at time ``t``, without the overlays if ``overlays``
+        is False (see ``draw_overlays``). The buffer is reused between calls.
+        """
+        canvas = self.canvas
+        k, ct = self._locate(t)
+        clip = self.segments[k]
+        frame = clip.get_frame(ct)
+
+        if frame.shape[1::-1] == self.size and clip.mask is None:
+            np.copyto(canvas, frame, casting="unsafe")
+        else:
+            canvas.fill(0)
+            alpha = to_alpha(clip.mask.get_frame(ct)) if clip.mask else None
+            x, y = compute_position(frame.shape[1::-1], self.size, "center")
+            blend_into(canvas, frame.astype(np.uint8), alpha, x, y)
+
+        if overlays:
+            self.draw_overlays(t)
+        return canvas
+
+    def draw_overlays(self, t):
+        for overlay in self.overlays:
+            if isinstance(overlay, VideoClip):
+                blend_clip(self.canvas, overlay, t)
+            else:
+                overlay.draw(self.canvas, t)
+
+
+def plan_holds(timeline, first, stop, fps):
+    """
+    The frames ``first:stop`` of ``timeline`` to render, and the ``holds``
+    of ``FrameEncoder``: how many times each rendered frame (by position in
+    that list) repeats because the next frames have the same state. The
+    last two frames are always rendered: the encoder must know where the
+    range ends, and the mp4 muxer gives the last frame the length of the
+    step before it, so a variable frame rate output would lose the frame
+    (and misplace whatever is joined after it) if that step were a hold.
+    """
+    rendered, holds = [], {}
+    previous = None
+    for index in range(first, stop):
+        state = timeline.state(index / fps)
+        if state is not None and state == previous and index < stop - 2:
+            holds[len(rendered) - 1] = holds.get(len(rendered) - 1, 0) + 1
+            continue
+        previous = state
+        rendered.append(index)
+    return rendered, holds
+
+
+def write_timeline(
+    segments,
+    filename,
+    fps,
+    audio=None,
+    overlays=(),
+    codec="libx264",
+    audio_codec="aac",
+    logger="bar",
+    frames=None,
+    progress=None,
+    base_filename=None,
+    **writer_params,
+):
+    """
+    Encode the ``TimelineCanvas`` of ``segments`` and ``overlays``. Frames go
+    to ffmpeg as raw RGB; ``audio`` (an ``AudioMix``) is streamed alongside
+    and muxed in.
+
+    ``frames`` restricts the output to a ``(first, stop)`` range of frame
+    indices of the full timeline, for segmented renders. ``progress``, if
+    given, is called with the number of frames written after each frame.
+    Returns the number of frames written and the encode speed in frames per
+    second. Runs of identical frames (see ``plan_holds``) are rendered once;
+    ``vfr`` (in ``writer_params``) encodes them once too.
+
+    With ``base_filename``, the frames are also saved as they are before the
+    overlays are blended in, losslessly (RGB x264 at QP 0), so the overlays
+    can later be redrawn over the decoded base without rendering the clips.
+    """
+    logger = proglog.default_bar_logger(logger)
+    timeline = TimelineCanvas(segments, overlays)
+    first, stop = frames or (0, int(timeline.duration * fps))
+    rendered, holds = plan_holds(timeline, first, stop, fps)
+
+    logger(message="MoviePy - Writing video %s\n" % filename)
+    with FrameEncoder(
+        filename,
+        timeline.size,
+        fps,
+        codec=codec,
+        audio=audio,
+        audio_codec=audio_codec,
+        holds=holds,
+        **writer_params,
+    ) as writer, ExitStack() as stack:
+        base = None
+        if base_filename is not None:
+            base = stack.enter_context(
+                FrameEncoder(
+                    base_filename,
+                    timeline.size,
+                    fps,
+                    codec="libx264rgb",
+                    preset="ultrafast",
+                    ffmpeg_params=["-qp", "0"],
+                    holds=holds,  # decoded frame by frame: never vfr
+                )
+            )
+        for j, index in enumerate(logger.iter_bar(frame_index=rendered)):
+            t = index / fps
+            if base is None:
+                writer.write_frame(timeline.render(t))
+            else:
+                frame = timeline.render(t, overlays=False)
+                base.write_frame(frame)
+                timeline.draw_overlays(t)
+                writer.write_frame(frame)
+            if progress is not None:
+                progress(index - first + 1 + holds.get(j, 0))
+
+    logger(
+        message="MoviePy - video ready %s (%d frames, %.1f fps)"
+        % (filename, writer.frames, writer.fps)
+    )
+    return {"frames": writer.frames, "fps": round(writer.fps, 2)}
@@ -0,0 +1,119 @@
+"""
+Content-addressed on-disk cache for rendered artifacts: encoded video pieces
+(intro, outro) and pre-resized images.
+
+Entries are keyed by a hash of the source file contents plus every render
+parameter that affects the encoded bytes, so the same intro rendered at the
+same size/fps/encoder settings is encoded once and reused by every later
+video. Total size is capped; the least recently used entries are evicted
+first (recency is tracked through the entries' mtime).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "video-gen-cache")
+
+_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, memoized per path/size/mtime."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digests:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+
+class RenderCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=2 << 30, suffix=".mp4"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(**params):
+        """Stable hash of JSON-serializable render parameters."""
+        blob = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + self.suffix)
+
+    def lookup(self, key):
+        """Path of the entry for ``key`` (marked as recently used), or None."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, key, dest):
+        """
+        Materialize the entry for ``key`` at ``dest`` (hard link, or copy
+        across filesystems) and mark it as recently used. Returns False on a
+        miss. Linking first means a concurrent eviction can't pull the file
+        out from under the caller.
+        """
+        path = self._path(key)
+        try:
+            try:
+                os.link(path, dest)
+            except OSError:
+                shutil.copyfile(path, dest)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, src):
+        """Copy the file ``src`` into the cache."""
+        with open(src, "rb") as f:
+            self.write(key, lambda out: shutil.copyfileobj(f, out))
+
+    def write(self, key, writer):
+        """
+        Create the entry for ``key`` by calling ``writer`` with a binary file
+        object, atomically, then enforce the size cap.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                writer(out)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until under ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
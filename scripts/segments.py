@@ -0,0 +1,120 @@
+"""
+Helpers for segment-parallel rendering: choosing where to split a timeline
+and joining independently encoded pieces back together without re-encoding.
+"""
+import math
+import os
+import subprocess
+import tempfile
+
+from moviepy.config import FFMPEG_BINARY
+
+from scripts.audio_mix import AudioFeed
+
+
+def frame_at(t, fps):
+    """Index of the first frame shown at or after time ``t``."""
+    return int(math.ceil(t * fps - 1e-6))
+
+
+def plan_segments(cuts, fps, total_frames, count):
+    """
+    Split ``total_frames`` into at most ``count`` frame ranges that start on
+    scene ``cuts`` (in seconds), as balanced as the cuts allow. Returns the
+    boundaries as frame indices, from 0 to ``total_frames``.
+    """
+    candidates = sorted({frame_at(c, fps) for c in cuts} - {0})
+    candidates = [f for f in candidates if f < total_frames]
+    bounds = [0]
+    for k in range(1, count):
+        target = k * total_frames / count
+        usable = [f for f in candidates if f > bounds[-1]]
+        if not usable:
+            break
+        bounds.append(min(usable, key=lambda f: abs(f - target)))
+    bounds.append(total_frames)
+    return bounds
+
+
+def concat_segments(paths, output, audio=None, audio_codec="aac", durations=None):
+    """
+    Join encoded pieces with the concat demuxer (stream copy) and mux in
+    ``audio``, an ``AudioMix`` streamed to ffmpeg and encoded with
+    ``audio_codec``. All pieces must share codec parameters.
+
+    ``durations`` (seconds, one per piece) place each piece exactly after
+    the previous one. Otherwise the demuxer goes by the pieces' own
+    durations, which in variable frame rate mp4s leave out the last frame.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", dir=os.path.dirname(paths[0]), delete=False
+    ) as listing:
+        for i, path in enumerate(paths):
+            listing.write("file '%s'\n" % os.path.abspath(path).replace("'", "'\\''"))
+            if durations is not None:
+                listing.write("duration %.6f\n" % durations[i])
+
+    cmd = [FFMPEG_BINARY, "-y", "-loglevel", "error"]
+    cmd += ["-f", "concat", "-safe", "0", "-i", listing.name]
+    feed = None
+    if audio is not None:
+        feed = AudioFeed(audio)
+        cmd += feed.input_args + ["-map", "0:v", "-map", "1:a"]
+        cmd += ["-c:a", audio_codec]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", output]
+    try:
+        proc = subprocess.Popen(cmd, pass_fds=feed.pass_fds if feed else ())
+        if feed is not None:
+            feed.start()
+            feed.join()
+        if proc.wait():
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+    finally:
+        os.remove(listing.name)
+
+
+def _ffmpeg_output(cmd):
+    return subprocess.run(
+        [FFMPEG_BINARY, "-loglevel", "error"] + cmd,
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+
+
+def parameter_sets(path):
+    """
+    The H.264 sequence and picture parameter sets (SPS/PPS NAL units) of the
+    first video stream of ``path``. Pieces can only be joined by stream copy
+    when these are identical.
+    """
+    data = _ffmpeg_output(
+        ["-i", path, "-map", "0:v:0", "-c:v", "copy"]
+        + ["-bsf:v", "h264_mp4toannexb", "-frames:v", "1", "-f", "h264", "-"]
+    )
+    units = [unit.strip(b"\x00") for unit in data.split(b"\x00\x00\x01")]
+    return tuple(unit for unit in units if unit and unit[0] & 0x1F in (7, 8))
+
+
+def copy_frames(source, count, output):
+    """
+    Copy the first ``count`` frames of ``source``'s video to ``output``
+    without re-encoding. A stream copy can only end cleanly on a frame
+    boundary when frames are stored in display order (no B-frames), so
+    returns False, writing nothing, if they are not or the source is short.
+    """
+    listing = _ffmpeg_output(
+        ["-i", source, "-map", "0:v:0", "-c:v", "copy"]
+        + ["-frames:v", str(count), "-f", "framecrc", "-"]
+    )
+    pts = [
+        int(line.split(b",")[2])
+        for line in listing.splitlines()
+        if line and not line.startswith(b"#")
+    ]
+    if len(pts) < count or any(a >= b for a, b in zip(pts, pts[1:])):
+        return False
+    _ffmpeg_output(
+        ["-y", "-i", source, "-map", "0:v:0", "-c:v", "copy", "-an"]
+        + ["-frames:v", str(count), output]
+    )
+    return True
@@ -0,0 +1,458 @@
+"""
+Declarative layout templates.
+
+A layout is a JSON file (YAML with PyYAML installed) in ``scripts/layouts``,
+or anywhere given its path. It describes the geometry and layers of the
+video's slideshow part, so a new layout needs no new Python code::
+
+    {
+      "images": {"slideshow": [0, null], "static": [1, null]},
+      "labels": ["Minimal", "Futuristic", "Luxury", "Modern"],
+      "background": [248, 226, 226],
+      "vars": {"padding": "int(min(W, H) * 0.04)", "main_h": "int(H * 0.4)"},
+      "layers": [
+        {"type": "rect", "box": ["padding", "padding", "W - 2 * padding",
+                                 "main_h"], "color": [255, 255, 255]},
+        {"type": "slideshow", "box": [...], "inset": 20, "fade": 0.5},
+        {"type": "group", "for": {"i": [0, 1], "col": [0, 1]},
+         "vars": {"x": "padding + col * 300"},
+         "layers": [{"type": "image", "source": "i", "box": [...]}]}
+      ],
+      "cursor": {"size": [60, 60]}
+    }
+
+Numbers can be given as arithmetic expressions over ``W``, ``H`` (the
+layout size), the ``vars`` (evaluated in order) and the loop variables of
+enclosing groups, with ``int``, ``min``, ``max``, ``round`` and ``abs``.
+
+``images`` slices the job's images into the ``slideshow`` and the ``static``
+images (Python slice bounds), and ``labels`` are the default captions of
+``text`` layers. Layers are drawn back to front:
+
+- ``rect``: a solid ``box`` (x, y, w, h) of ``color``, with ``opacity``
+- ``image``: static image ``source`` scaled to fit ``box`` less ``inset``
+  on every side, and centred in it
+- ``text``: label ``source`` in ``color`` at ``font_size``, horizontally
+  centred in ``box`` (x, y, w)
+- ``slideshow`` (at most one): the slideshow images in turn, fitted like
+  ``image``. Each fades in over ``fade`` seconds, and the last one (or
+  every one, with ``"fade_out": "all"``) fades out; with ``"fades":
+  "crossfade"`` the first slide only fades in, the last only fades out
+  and the others do both. Slides share the layout's duration, or last
+  ``slide_duration`` seconds and cycle through the images, each
+  overlapping the next by ``overlap`` seconds. With a
+  ``transition`` of ``crossfade``, ``slide`` or ``zoom`` (rather than the
+  default ``fade``) each slide instead hands over to the next while they
+  overlap (by ``fade`` seconds unless ``overlap`` is given), and only the
+  first and last slides fade.
+- ``target``: a point (``at``) the ``cursor`` glides to, one per slide
+- ``group``: its ``layers`` repeated for every index of the ``for``
+  lists, with its own ``vars``
+"""
+import ast
+import json
+import operator
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from moviepy import ColorClip, ImageClip, TextClip
+
+from scripts.images import fit_images
+from scripts.render_cache import file_digest
+from scripts.transitions import TRANSITIONS
+
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts")
+DEFAULT_LAYOUT = "decory"
+
+# A slide of a low-memory layout, decoded by the renderer when it is shown:
+# the image at ``path`` fitted to ``box`` and centred in ``slot`` (x, y, w, h)
+LazySlide = namedtuple("LazySlide", "path box slot start duration")
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_FUNCTIONS = {"int": int, "min": min, "max": max, "round": round, "abs": abs}
+
+_templates = {}
+
+
+# ───────────────────────────── Loading ───────────────────────────
+def layout_path(name):
+    """Path of the layout ``name``: a file path, or a layout shipped here."""
+    if os.path.isfile(name):
+        return name
+    for ext in (".json", ".yaml", ".yml"):
+        path = os.path.join(LAYOUT_DIR, name + ext)
+        if os.path.isfile(path):
+            return path
+    raise ValueError("Unknown layout %r (no such file in %s)" % (name, LAYOUT_DIR))
+
+
+def load_template(name):
+    """
+    The parsed layout template ``name`` (see ``layout_path``), memoized per
+    file contents. Its ``digest`` (of the file) identifies it in cache keys.
+    """
+    path = layout_path(name)
+    digest = file_digest(path)
+    template = _templates.get(digest)
+    if template is None:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("YAML layouts need `pip install pyyaml`")
+                template = yaml.safe_load(f)
+            else:
+                template = json.load(f)
+        template["digest"] = digest
+        template.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+        _templates[digest] = template
+    return template
+
+
+def split_images(template, images):
+    """The job's ``images`` as the template's (slideshow, static) images."""
+    spec = template.get("images", {})
+    slideshow = images[slice(*spec.get("slideshow", [0, None]))]
+    static = images[slice(*spec["static"])] if "static" in spec else []
+    return slideshow, static
+
+
+# ─────────────────────────── Expressions ─────────────────────────
+@lru_cache(maxsize=None)
+def _parse(expr):
+    return ast.parse(expr, mode="eval").body
+
+
+def _eval(node, names):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise ValueError("Unknown name %r in layout expression" % node.id)
+        return names[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _eval(node.left, names), _eval(node.right, names)
+        return _OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_eval(node.operand, names)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        return _FUNCTIONS[node.func.id](*(_eval(arg, names) for arg in node.args))
+    raise ValueError("Unsupported layout expression: %s" % ast.unparse(node))
+
+
+def evaluate(expr, names):
+    """Value of a template number: a literal, or an expression over ``names``."""
+    if isinstance(expr, str):
+        return _eval(_parse(expr), names)
+    return expr
+
+
+def _bind(variables, names):
+    names = dict(names)
+    for key, expr in variables.items():
+        names[key] = evaluate(expr, names)
+    return names
+
+
+def resolve(template, width, height, design_size=None):
+    """
+    Evaluate the template for a ``width`` x ``height`` layout: its layers as
+    a flat, drawing-ordered list with every group expanded and every number
+    computed (boxes and points as int tuples).
+
+    With a ``design_size`` (w, h), the template is evaluated at that size
+    and the result scaled down to ``width`` x ``height``, so e.g. a preview
+    is the full-size layout in miniature rather than a layout of its own.
+    """
+    if design_size is None:
+        names = _bind(template.get("vars", {}), {"W": width, "H": height})
+        return list(_expand(template.get("layers", []), names))
+    items = resolve(template, *design_size)
+    scale = (width / design_size[0], height / design_size[1])
+    for item in items:
+        for key in ("box", "at"):
+            if key in item:
+                item[key] = tuple(
+                    int(v * scale[i % 2]) for i, v in enumerate(item[key])
+                )
+        if "inset" in item:
+            item["inset"] = int(round(item["inset"] * min(scale)))
+        if "font_size" in item:
+            item["font_size"] = max(1, int(round(item["font_size"] * min(scale))))
+    return items
+
+
+def scaled_size(size, width, height, design_size=None):
+    """A pixel ``size`` of the template at ``design_size``, scaled like ``resolve``."""
+    if design_size is None:
+        return tuple(size)
+    scale = (width / design_size[0], height / design_size[1])
+    return tuple(max(1, int(round(v * scale[i % 2]))) for i, v in enumerate(size))
+
+
+def _expand(layers, names):
+    for layer in layers:
+        if layer["type"] == "group":
+            loops = layer.get("for", {})
+            count = min((len(values) for values in loops.values()), default=1)
+            for k in range(count):
+                scope = dict(names, **{key: values[k] for key, values in loops.items()})
+                scope = _bind(layer.get("vars", {}), scope)
+                yield from _expand(layer.get("layers", []), scope)
+            continue
+        item = dict(layer)
+        for key in ("box", "at"):
+            if key in item:
+                item[key] = tuple(int(evaluate(v, names)) for v in item[key])
+        for key in ("source", "inset", "font_size", "opacity"):
+            if key in item:
+                item[key] = evaluate(item[key], names)
+        yield item
+
+
+# ───────────────────────────── Layers ────────────────────────────
+def _solid(size, color):
+    """A ColorClip stored as uint8 (MoviePy tiles the colour into int64)."""
+    return ColorClip(size, color=np.array(color, np.uint8))
+
+
+def _boxes_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _fit_box(item):
+    x, y, w, h = item["box"]
+    inset = item.get("inset", 0)
+    return (w - 2 * inset, h - 2 * inset)
+
+
+def _centred(item, size):
+    x, y, w, h = item["box"]
+    return (x + (w - size[0]) // 2, y + (h - size[1]) // 2)
+
+
+def schedule_slides(spec, images, total_duration):
+    """
+    Timing of the ``slideshow`` layer ``spec``: the duration of one slide
+    and a ``(path, start, duration, fade_in, fade_out)`` tuple per slide.
+    """
+    count = len(images)
+    if not spec or not count:
+        return total_duration, []
+    # Hand-over transitions happen while a slide overlaps the next one
+    handover = spec.get("transition", "fade") != "fade"
+    overlap = spec.get("overlap", spec.get("fade", 0.5) if handover else 0.0)
+    if "slide_duration" in spec:
+        slide_duration = spec["slide_duration"]
+        total = max(1, int(np.ceil(total_duration / slide_duration - 1e-9)))
+    else:
+        slide_duration = total_duration / count
+        total = count
+    every = spec.get("fade_out", "last") == "all"
+    crossfade = spec.get("fades") == "crossfade"
+    slides = []
+    for k in range(total):
+        start = k * slide_duration
+        duration = min(slide_duration + overlap, total_duration - start)
+        last = k == total - 1
+        if handover:
+            fade_in, fade_out = k == 0, last
+        elif crossfade:
+            fade_in, fade_out = k == 0 or not last, k > 0
+        else:
+            fade_in, fade_out = True, every or last
+        slides.append((images[k % count], start, duration, fade_in, fade_out))
+    return slide_duration, slides
+
+
+def _check_inputs(template, items, static_images, labels):
+    """Check the static images and labels given match what the layers use."""
+    need_images = max(
+        (int(i["source"]) + 1 for i in items if i["type"] == "image"), default=0
+    )
+    need_labels = max(
+        (int(i["source"]) + 1 for i in items if i["type"] == "text"), default=0
+    )
+    if len(static_images) != need_images or len(labels) != need_labels:
+        raise ValueError(
+            "The %s layout requires exactly %d static images and %d labels"
+            % (template["name"], need_images, need_labels)
+        )
+
+
+def static_key(template, static_images, labels, width, height, design_size=None):
+    """Everything the static layers' pixels depend on, for cache keys."""
+    return dict(
+        layout=template["digest"],
+        size=[width, height],
+        design_size=list(design_size) if design_size else None,
+        images=[file_digest(p) if os.path.exists(p) else None for p in static_images],
+        labels=list(labels),
+    )
+
+
+def _slideshow(items, slideshow=None):
+    """The resolved slideshow layer among ``items``, or None."""
+    shows = [item for item in items if item["type"] == "slideshow"]
+    if len(shows) > 1:
+        raise ValueError("A layout can have at most one slideshow layer")
+    show = dict(shows[0], **(slideshow or {})) if shows else None
+    if show is not None and show.get("transition", "fade") not in TRANSITIONS:
+        raise ValueError("Unknown slide transition %r" % show["transition"])
+    return show
+
+
+def slideshow_layer(template, width, height, slideshow=None, design_size=None):
+    """
+    The template's slideshow layer as ``build_layers`` resolves it (None
+    without one), for ``schedule_slides`` without building the layout.
+    """
+    return _slideshow(resolve(template, width, height, design_size), slideshow)
+
+
+def build_layers(
+    template,
+    slideshow_images,
+    static_images,
+    labels,
+    width,
+    height,
+    total_duration,
+    image_cache=None,
+    low_memory=False,
+    static=True,
+    slideshow=None,
+    design_size=None,
+):
+    """
+    Build the clips of a layout template without compositing them.
+
+    Returns a dict with the static layers drawn beneath the slideshow
+    (``below``) and above it (``above``), the positioned and timed
+    ``slides`` (no fades applied) with their ``fades`` (fade in, fade out)
+    flags, ``fade`` duration, ``transition`` and ``slot`` box (see
+    ``scripts.transitions.SlideTrack``), the cursor ``positions`` and
+    ``cursor_size`` (None without a cursor) and the ``slide_duration``.
+    ``slideshow`` overrides keys of the template's slideshow layer, and
+    ``static=False`` skips the static layers (for a cached background),
+    and ``design_size`` scales a layout designed for that size down to
+    ``width`` x ``height`` (see ``resolve``).
+
+    Images are decoded once and scaled to their slot by ``fit_images``,
+    which keeps the results on disk when given an ``image_cache``. With
+    ``low_memory`` the slides are not decoded here: ``slides`` holds
+    ``LazySlide`` records instead, and the static images are memory-mapped
+    from the cache when possible (see ``fit_images``'s ``shared``).
+    """
+    labels = template.get("labels", []) if labels is None else labels
+    items = resolve(template, width, height, design_size)
+    _check_inputs(template, items, static_images, labels)
+    show = _slideshow(items, slideshow)
+    slide_duration, schedule = schedule_slides(
+        show, slideshow_images, total_duration
+    )
+
+    requests = []
+    if static:
+        requests += [
+            (static_images[int(item["source"])], _fit_box(item))
+            for item in items
+            if item["type"] == "image"
+            and os.path.exists(static_images[int(item["source"])])
+        ]
+    if show is not None and not low_memory:
+        requests += [(p, _fit_box(show)) for p in slideshow_images if os.path.exists(p)]
+    fitted = dict(zip(requests, fit_images(requests, image_cache, low_memory)))
+
+    slides, fades = [], []
+    for path, start, duration, fade_in, fade_out in schedule:
+        if not os.path.exists(path):
+            continue
+        fades.append((fade_in, fade_out))
+        if low_memory:
+            slides.append(LazySlide(path, _fit_box(show), show["box"], start, duration))
+            continue
+        clip = ImageClip(fitted[path, _fit_box(show)], duration=duration)
+        clip = clip.with_position(_centred(show, clip.size)).with_start(start)
+        slides.append(clip)
+
+    # Static layers go beneath the slideshow unless drawn after it and over
+    # it (or over such a layer), so they flatten into one background frame
+    below, above, positions = [], [], []
+    if static:
+        background = _solid((width, height), template.get("background", (0, 0, 0)))
+        below.append(background.with_duration(total_duration))
+    shown = None
+    for item in items:
+        kind = item["type"]
+        clip = None
+        if kind == "slideshow":
+            x, y, w, h = item["box"]
+            shown = (x, y, x + w, y + h)
+        elif kind == "target":
+            positions.append(item["at"])
+        elif not static:
+            continue
+        elif kind == "rect":
+            x, y, w, h = item["box"]
+            clip = _solid((w, h), item["color"]).with_position((x, y))
+            clip = clip.with_duration(total_duration)
+            if "opacity" in item:
+                clip = clip.with_opacity(item["opacity"])
+        elif kind == "image":
+            path = static_images[int(item["source"])]
+            if os.path.exists(path):
+                clip = ImageClip(fitted[path, _fit_box(item)], duration=total_duration)
+                clip = clip.with_position(_centred(item, clip.size))
+        elif kind == "text":
+            x, y, w = item["box"][:3]
+            clip = TextClip(
+                text=labels[int(item["source"])],
+                font_size=item["font_size"],
+                color=item.get("color", "black"),
+            )
+            clip = clip.with_duration(total_duration)
+            clip = clip.with_position((x + (w - clip.w) // 2, y))
+        else:
+            raise ValueError("Unknown layout layer type %r" % kind)
+        if clip is None:
+            continue
+        x, y = clip.pos(0)
+        box = (x, y, x + clip.w, y + clip.h)
+        if shown is not None and (above or _boxes_overlap(box, shown)):
+            above.append(clip)
+        else:
+            below.append(clip)
+
+    cursor = template.get("cursor")
+    return {
+        "below": below,
+        "above": above,
+        "slides": slides,
+        "fades": fades,
+        "fade": show.get("fade", 0.5) if show is not None else 0.0,
+        "transition": show.get("transition", "fade") if show is not None else None,
+        "slot": tuple(show["box"]) if show is not None else None,
+        "positions": positions,
+        "cursor_size": (
+            scaled_size(cursor["size"], width, height, design_size)
+            if cursor and positions
+            else None
+        ),
+        "slide_duration": slide_duration,
+    }
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Transcribe voice-over audio to SRT subtitles with Whisper, keeping the model
+loaded between files.
+
+Replaces one ``python -m whisper`` process per audio file, each reloading the
+model weights from disk. ``get_transcriber`` keeps one loaded model per
+settings for the life of the process (a job queue worker transcribes
+every job's voice-over with it), and finished subtitles are cached by audio
+hash so re-rendering the same voice clip skips transcription entirely.
+
+Like the Whisper CLI, the subtitles for ``clip.mp3`` are written to
+``<output-dir>/clip.srt``.
+
+Backends: ``whisper`` (openai-whisper, as before) or ``faster-whisper``
+(CTranslate2), which also runs int8-quantized models on CPU (``--int8``).
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.instrumentation import stage
+from scripts.render_cache import DEFAULT_CACHE_DIR, RenderCache, file_digest
+
+
+# ────────────────────────────── SRT ──────────────────────────────
+def format_timestamp(seconds):
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, ms)
+
+
+def write_srt(segments, path):
+    """Write ``(start, end, text)`` segments the way Whisper's SRT writer does."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(segments, start=1):
+            f.write(
+                "%d\n%s --> %s\n%s\n\n"
+                % (
+                    i,
+                    format_timestamp(start),
+                    format_timestamp(end),
+                    text.strip().replace("-->", "->"),
+                )
+            )
+
+
+# ─────────────────────────── Transcriber ─────────────────────────
+class Transcriber:
+    """One loaded Whisper model plus the subtitle cache in front of it."""
+
+    def __init__(
+        self,
+        model="small",
+        language="en",
+        backend="whisper",
+        int8=False,
+        device="cpu",
+        cache=None,
+    ):
+        if int8 and backend != "faster-whisper":
+            raise ValueError("int8 models need the faster-whisper backend")
+        self.model_name = model
+        self.language = language
+        self.backend = backend
+        self.int8 = int8
+        self.device = device
+        self.cache = cache
+        self._model = None
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+        if self.backend == "faster-whisper":
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise ImportError(
+                    "the faster-whisper backend needs `pip install faster-whisper`"
+                )
+            self._model = WhisperModel(
+                self.model_name,
+                device=self.device,
+                compute_type="int8" if self.int8 else "default",
+            )
+        else:
+            try:
+                import whisper
+            except ImportError:
+                raise ImportError(
+                    "the whisper backend needs `pip install openai-whisper`"
+                )
+            self._model = whisper.load_model(self.model_name, device=self.device)
+        return self._model
+
+    def segments(self, audio_path):
+        """Transcribe ``audio_path`` into ``(start, end, text)`` segments."""
+        model = self._load()
+        if self.backend == "faster-whisper":
+            segments, _ = model.transcribe(audio_path, language=self.language)
+            return [(s.start, s.end, s.text) for s in segments]
+        result = model.transcribe(
+            audio_path, language=self.language, fp16=model.device.type == "cuda"
+        )
+        return [(s["start"], s["end"], s["text"]) for s in result["segments"]]
+
+    def _cache_key(self, audio_path):
+        return self.cache.key(
+            audio=file_digest(audio_path),
+            model=self.model_name,
+            language=self.language,
+            backend=self.backend,
+            int8=self.int8,
+        )
+
+    def transcribe(self, audio_path, output_dir):
+        """Write ``<output_dir>/<audio basename>.srt`` and return its path."""
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(audio_path))[0]
+        srt_path = os.path.join(output_dir, base + ".srt")
+
+        key = self._cache_key(audio_path) if self.cache is not None else None
+        if key is not None:
+            if os.path.exists(srt_path):
+                os.remove(srt_path)
+            if self.cache.fetch(key, srt_path):
+                print("Subtitles for %s from cache" % audio_path, file=sys.stderr)
+                return srt_path
+
+        write_srt(self.segments(audio_path), srt_path)
+        if key is not None:
+            self.cache.store(key, srt_path)
+        return srt_path
+
+    def transcribe_many(self, audio_paths, output_dir):
+        return [self.transcribe(path, output_dir) for path in audio_paths]
+
+
+_transcribers = {}
+
+
+def get_transcriber(model, language, backend, int8, device, cache_dir, cache_size_mb):
+    """Process-wide transcriber per settings, so each model is loaded once."""
+    key = (model, language, backend, int8, device)
+    if key not in _transcribers:
+        _transcribers[key] = Transcriber(model, language, backend, int8, device)
+    transcriber = _transcribers[key]
+    transcriber.cache = (
+        RenderCache(
+            os.path.join(cache_dir, "subtitles"),
+            int(cache_size_mb * 1024 * 1024),
+            suffix=".srt",
+        )
+        if cache_dir
+        else None
+    )
+    return transcriber
+
+
+# ────────────────────────────── CLI ──────────────────────────────
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Transcribe audio files to SRT subtitles with Whisper"
+    )
+    parser.add_argument("audio", nargs="+", help="audio files to transcribe")
+    parser.add_argument(
+        "--output-dir", required=True, help="directory for the .srt files"
+    )
+    parser.add_argument(
+        "--model",
+        default="small",
+        help="Whisper model name (tiny, base, small, ...; default small)",
+    )
+    parser.add_argument("--language", default="en", help="spoken language")
+    parser.add_argument(
+        "--backend",
+        choices=["whisper", "faster-whisper"],
+        default="whisper",
+        help="openai-whisper or the CTranslate2-based faster-whisper",
+    )
+    parser.add_argument(
+        "--int8",
+        action="store_true",
+        help="int8-quantized model (faster-whisper backend only)",
+    )
+    parser.add_argument("--device", default="cpu", help="cpu or cuda")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("RENDER_CACHE_DIR", DEFAULT_CACHE_DIR),
+        help="subtitles are cached under <cache-dir>/subtitles by audio hash",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=float,
+        default=64,
+        help="size limit of the subtitle cache",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always transcribe, ignoring cached subtitles",
+    )
+    return parser
+
+
+def run_transcribe(argv, parser=None):
+    """
+    Transcribe the files named by ``argv`` and return a JSON-able status
+    dict, like ``moviepy_create_video.run_job``.
+    """
+    parser = parser or build_parser()
+    started = time.perf_counter()
+    args = None
+    try:
+        with redirect_stdout(sys.stderr):
+            args = parser.parse_args(argv)
+            transcriber = get_transcriber(
+                args.model,
+                args.language,
+                args.backend,
+                args.int8,
+                args.device,
+                None if args.no_cache else args.cache_dir,
+                args.cache_size_mb,
+            )
+            with stage("transcribe"):
+                subtitles = transcriber.transcribe_many(args.audio, args.output_dir)
+    except (Exception, SystemExit) as exc:
+        traceback.print_exc(file=sys.stderr)
+        if isinstance(exc, SystemExit):
+            error = "invalid arguments (argparse output is on stderr)"
+        else:
+            error = str(exc) or repr(exc)
+        invalid = isinstance(exc, (SystemExit, ValueError)) or (
+            isinstance(exc, OSError)
+            and args is not None
+            and any(not os.path.exists(path) for path in args.audio)
+        )
+        return {"status": "error", "error": error, "invalid": invalid}
+    return {
+        "status": "done",
+        "subtitles": subtitles,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    result = run_transcribe(argv)
+    if result["status"] != "done":
+        sys.exit(result["error"])
+    for path in result["subtitles"]:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
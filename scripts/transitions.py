@@ -0,0 +1,210 @@
+"""
+Slide transitions for the slideshow slot of a layout.
+
+Slides are still images, so the slot only changes while one fades or hands
+over to the next: ``SlideTrack`` describes the slot at a time ``t`` by a
+small hashable ``state`` and recomposes it only when that state changes.
+Fades go through a 256-entry lookup table per frame instead of float math
+over the whole image, and the hand-overs mix or move uint8/uint16 arrays.
+"""
+import numpy as np
+from PIL import Image
+
+from scripts.blit import blend_into, to_alpha
+
+TRANSITIONS = ("fade", "crossfade", "slide", "zoom")
+
+
+def ease(t):
+    """Smoothstep easing: ease-in-out"""
+    return 3 * (t**2) - 2 * (t**3)
+
+
+def fade_table(factors):
+    """
+    Lookup table of uint8 values multiplied by each of ``factors`` and
+    truncated, so ``table[image]`` is ``(image * a * b).astype(np.uint8)``
+    (what MoviePy's FadeIn/FadeOut produce once composited).
+    """
+    table = np.arange(256, dtype=float)
+    for factor in factors:
+        table = table * factor
+    return table.astype(np.uint8)
+
+
+def slide_from_clip(clip, fade_in=True, fade_out=False):
+    """The ``SlideTrack`` record of an ImageClip at a fixed (x, y) position."""
+    x, y = clip.pos(0)
+    return {
+        "start": clip.start,
+        "end": clip.start + clip.duration,
+        "fade_in": fade_in,
+        "fade_out": fade_out,
+        "image": np.asarray(clip.img, np.uint8),
+        "alpha": to_alpha(clip.mask.img) if clip.mask else None,
+        "xy": (int(x), int(y)),
+    }
+
+
+class SlideTrack:
+    """
+    The slides of a layout shown in their ``slot`` (x, y, w, h) over the
+    ``background`` frame.
+
+    ``slides`` are dicts with ``start``, ``end``, ``fade_in``/``fade_out``
+    flags, the uint8 ``image``, its ``alpha`` (None when opaque) and the
+    frame position ``xy`` of its top-left corner; ``load(slide)`` fills in
+    the last three of a slide whose image is None when it comes into view,
+    and with ``release`` images are dropped again once out of view.
+
+    With the ``fade`` transition every slide fades from black over ``fade``
+    seconds (and out, if flagged), on its own. The others hand over from a
+    slide to the next while the two overlap: ``crossfade`` mixes them,
+    ``slide`` pushes the old one out to the left and ``zoom`` grows the new
+    one from the centre; only the first and last slides fade.
+    """
+
+    def __init__(
+        self,
+        slides,
+        background,
+        slot,
+        transition="fade",
+        fade=0.5,
+        load=None,
+        release=False,
+    ):
+        if transition not in TRANSITIONS:
+            raise ValueError("Unknown slide transition %r" % transition)
+        self.slides = slides
+        self.background = background
+        self.slot = slot
+        self.transition = transition
+        self.fade = fade
+        self.load = load
+        self.release = release
+        self.starts = np.array([slide["start"] for slide in slides])
+        self.longest = max(
+            (slide["end"] - slide["start"] for slide in slides), default=0.0
+        )
+        self.buffer = None
+        self._rendered = None
+        self._loaded = set()
+        self._scratch = {}
+
+    def showing(self, t):
+        """Indices of the slides showing at ``t``, back to front."""
+        # Slides are sorted by start: only those starting in the last
+        # ``longest`` seconds can be showing
+        first = int(np.searchsorted(self.starts, t - self.longest, side="right"))
+        stop = int(np.searchsorted(self.starts, t, side="right"))
+        return [k for k in range(first, stop) if t < self.slides[k]["end"]]
+
+    def _factors(self, slide, t):
+        ct = t - slide["start"]
+        factors = []
+        if slide["fade_in"] and ct < self.fade:
+            factors.append(ct / self.fade)
+        remaining = slide["end"] - slide["start"] - ct
+        if slide["fade_out"] and remaining < self.fade:
+            factors.append(remaining / self.fade)
+        return tuple(factors)
+
+    def state(self, t):
+        """
+        What the slot shows at ``t``: equal states mean identical pixels.
+        Each showing slide with its fade factors, and the progress of the
+        hand-over to the last one, if any.
+        """
+        showing = self.showing(t)
+        layers = tuple((k, self._factors(self.slides[k], t)) for k in showing)
+        if self.transition == "fade" or len(showing) < 2:
+            return layers, None
+        prev, k = self.slides[showing[-2]], self.slides[showing[-1]]
+        return layers, (t - k["start"]) / (prev["end"] - k["start"])
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        """A scratch array reused across frames (grown as needed)."""
+        size = int(np.prod(shape))
+        scratch = self._scratch.get(name)
+        if scratch is None or scratch.size < size:
+            scratch = self._scratch[name] = np.empty(size, dtype)
+        return scratch[:size].reshape(shape)
+
+    def _paste(self, dst, k, factors, origin=(0, 0)):
+        slide = self.slides[k]
+        image = slide["image"]
+        if factors:
+            faded = self._buffer("faded", image.shape)
+            image = np.take(fade_table(factors), image, out=faded)
+        x, y = slide["xy"]
+        blend_into(dst, image, slide["alpha"], x - origin[0], y - origin[1])
+
+    def _composed(self, k, factors):
+        """The slot as it would look with slide ``k`` alone."""
+        x, y, w, h = self.slot
+        slot = self._buffer("incoming", (h, w, 3))
+        np.copyto(slot, self.background[y : y + h, x : x + w])
+        self._paste(slot, k, factors, (x, y))
+        return slot
+
+    def draw(self, out, t, state=None):
+        """Draw the slides at ``t`` onto the frame ``out``."""
+        layers, progress = self.state(t) if state is None else state
+        showing = [k for k, _ in layers]
+        if self.release:
+            for k in self._loaded.difference(showing):
+                self.slides[k]["image"] = self.slides[k]["alpha"] = None
+            self._loaded.intersection_update(showing)
+        for k in showing:
+            if self.slides[k]["image"] is None:
+                self.load(self.slides[k])
+                self._loaded.add(k)
+
+        if progress is not None:
+            *layers, (k, factors) = layers
+        for layer in layers:
+            self._paste(out, *layer)
+        if progress is None:
+            return
+
+        # Hand-over: the slot shows the outgoing slide; bring in slide k
+        x, y, w, h = self.slot
+        region = out[y : y + h, x : x + w]
+        incoming = self._composed(k, factors)
+        if self.transition == "crossfade":
+            weight = np.uint16(int(progress * 256 + 0.5))
+            mixed = self._buffer("mixed", region.shape, np.uint16)
+            other = self._buffer("other", region.shape, np.uint16)
+            np.multiply(region, np.uint16(256) - weight, out=mixed)
+            np.multiply(incoming, weight, out=other)
+            mixed += other
+            mixed += np.uint16(128)
+            mixed >>= 8
+            np.copyto(region, mixed, casting="unsafe")
+        elif self.transition == "slide":
+            shift = int(round(ease(progress) * w))
+            region[:, : w - shift] = region[:, shift:]
+            region[:, w - shift :] = incoming[:, :shift]
+        else:  # zoom
+            scale = ease(progress)
+            size = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+            grown = Image.fromarray(incoming).resize(size, Image.Resampling.BILINEAR)
+            left, top = (w - size[0]) // 2, (h - size[1]) // 2
+            blend_into(region, np.asarray(grown), None, left, top)
+
+    def render(self, t):
+        """
+        The slot at ``t`` as an (h, w, 3) array, recomposed only when its
+        state changed since the previous call. The buffer is reused.
+        """
+        x, y, w, h = self.slot
+        if self.buffer is None:
+            self.buffer = np.array(self.background)
+        state = self.state(t)
+        if state != self._rendered:
+            region = self.buffer[y : y + h, x : x + w]
+            np.copyto(region, self.background[y : y + h, x : x + w])
+            self.draw(self.buffer, t, state)
+            self._rendered = state
+        return self.buffer[y : y + h, x : x + w]
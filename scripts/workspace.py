@@ -0,0 +1,141 @@
+"""
+Private working directories for render jobs, so renders can run side by
+side on one machine.
+
+Every job writes its intermediate files (encoded pieces, concat listings)
+and the output itself into its own directory under a workspace root (the
+system temp directory, or e.g. ``/dev/shm`` to keep them in memory). The
+finished output is then moved to its destination atomically, so readers
+never see a half-written video, and the directory is removed whatever the
+outcome. Directories left behind by killed processes are removed by the
+next job started under the same root.
+"""
+import os
+import shutil
+import signal
+import tempfile
+import uuid
+
+DEFAULT_WORKSPACE_ROOT = os.path.join(tempfile.gettempdir(), "video-gen-jobs")
+
+
+def new_job_id():
+    """A unique job id (unlike timestamps, safe for jobs started together)."""
+    return uuid.uuid4().hex
+
+
+def publish(src, dest):
+    """
+    Move the file ``src`` to ``dest`` atomically, replacing any previous
+    file. Across filesystems it is first copied next to ``dest``.
+    """
+    try:
+        os.replace(src, dest)
+        return
+    except OSError:
+        if not os.path.exists(src):
+            raise
+    # Not mkstemp: the output gets the usual permissions, not 0600
+    tmp = os.path.join(
+        os.path.dirname(os.path.abspath(dest)),
+        ".%s.%s.part" % (os.path.basename(dest), new_job_id()),
+    )
+    try:
+        with open(tmp, "xb") as out, open(src, "rb") as f:
+            shutil.copyfileobj(f, out)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    os.remove(src)
+
+
+def _alive(pid):
+    if os.name == "nt":  # os.kill would terminate it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # another user's
+        return True
+    return True
+
+
+def sweep_stale(root):
+    """Remove the workspaces under ``root`` of processes no longer running."""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return
+    for name in names:
+        pid = name.split("-")[1] if name.startswith("job-") else ""
+        if pid.isdigit() and not _alive(int(pid)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class JobWorkspace:
+    """
+    The working directory of one job writing ``output``, as a context
+    manager: ``path(name)`` names a file inside it, and ``output`` is where
+    the job writes its result, ``sidecar(suffix)`` where it writes a file
+    going along with it, and ``extra(dest)`` one going anywhere. Leaving the
+    block normally publishes those files to their real paths (the output
+    last); the directory is removed either way.
+    """
+
+    def __init__(self, output, root=None):
+        self.final = output
+        self.root = root or DEFAULT_WORKSPACE_ROOT
+        self.job_id = new_job_id()
+        self.dir = None
+        self.extras = []  # (name in the workspace, destination)
+
+    def __enter__(self):
+        os.makedirs(self.root, exist_ok=True)
+        sweep_stale(self.root)
+        self.dir = tempfile.mkdtemp(
+            prefix="job-%d-%s-" % (os.getpid(), self.job_id), dir=self.root
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                for name, dest in self.extras:
+                    publish(self.path(name), dest)
+                publish(self.output, self.final)
+        finally:
+            shutil.rmtree(self.dir, ignore_errors=True)
+        return False
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    @property
+    def output(self):
+        return self.path(os.path.basename(self.final))
+
+    def sidecar(self, suffix):
+        """Path of the output's name with ``suffix`` for its extension."""
+        return self.extra(os.path.splitext(self.final)[0] + suffix)
+
+    def extra(self, dest):
+        """Path to write a file published to ``dest``, keeping its extension."""
+        name = "extra-%d-%s" % (len(self.extras), os.path.basename(dest))
+        self.extras.append((name, dest))
+        return self.path(name)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt("terminated by signal %d" % signum)
+
+
+def interrupt_on_sigterm():
+    """
+    Handle SIGTERM like Ctrl-C, so a stopped render still unwinds and
+    removes its workspace (and ffmpeg children) as on any other failure.
+    Call from the main thread.
+    """
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _interrupt)
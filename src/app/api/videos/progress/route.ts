@@ -1,7 +1,34 @@
-import { NextRequest } from "next/server";
+import { NextRequest, NextResponse } from "next/server";
+import { describeEvent, jobStatuses } from "@/lib/jobQueue";
 import { progressEmitter } from "@/lib/progressEmitter";
 
+// Last progress relayed per job, so polls don't repeat lines on the stream
+const relayed = new Map<string, number>();
+
+/**
+ * GET ?ids=a,b: JSON statuses of queued render jobs, their latest progress
+ * also relayed as "log" lines to the event stream. Without ids: that
+ * stream, as server-sent events.
+ */
 export async function GET(req: NextRequest) {
+  const ids = req.nextUrl.searchParams.get("ids");
+  if (ids) {
+    const jobs = await jobStatuses(ids.split(",").filter(Boolean));
+    for (const job of jobs) {
+      if (!job) continue;
+      if (job.status === "done" || job.status === "error") {
+        relayed.delete(job.id);
+        continue;
+      }
+      const ev = job.progress;
+      if (!ev || relayed.get(job.id) === ev.time) continue;
+      relayed.set(job.id, ev.time);
+      const msg = describeEvent(ev);
+      if (msg) progressEmitter.emit("log", msg);
+    }
+    return NextResponse.json({ jobs });
+  }
+
   const encoder = new TextEncoder();
 
   const stream = new ReadableStream({
@@ -1,14 +1,31 @@
 import { NextRequest, NextResponse } from "next/server";
+import { createHash, randomUUID } from "crypto";
 import fs from "fs/promises";
 import path from "path";
 import { synthesize } from "@/lib/elevenlabs";
-import { createVideo } from "@/lib/moviepy";
+import { DELIVERABLES, enqueueVideo, extraOutputPath } from "@/lib/moviepy";
 
 // toggle between real and test data
 const USE_FAKE_DATA = process.env.USE_FAKE_DATA === "true";
 
 export async function POST(req: NextRequest) {
-  const { script, scripts, voiceId, voiceIds, images } = await req.json();
+  // preview: fast low-resolution drafts (subtitles as a .vtt sidecar);
+  // poster: only the frame at that many seconds, as a PNG thumbnail;
+  // deliverables: also the square, mobile, poster and GIF versions, in the
+  // same render
+  const {
+    script,
+    scripts,
+    voiceId,
+    voiceIds,
+    images,
+    priority,
+    preview,
+    poster,
+    deliverables,
+  } = await req.json();
+  const extraOutputs =
+    deliverables && !preview && poster === undefined ? DELIVERABLES : undefined;
 
   let scriptList: string[];
   let voiceList: string[];
@@ -42,7 +59,13 @@ Join thousands of innovators who trust us to transform ideas into reality—beca
 
   const batchSize = 5;
   const totalBatches = Math.ceil(imagePaths.length / batchSize);
-  const urls: string[] = [];
+  const jobs: {
+    id: string;
+    status: string;
+    url: string;
+    subtitlesUrl?: string;
+    outputs?: string[];
+  }[] = [];
 
   for (let batchIndex = 0; batchIndex < totalBatches; batchIndex++) {
     const batchImages = imagePaths.slice(
@@ -56,18 +79,54 @@ Join thousands of innovators who trust us to transform ideas into reality—beca
         const audioPath = USE_FAKE_DATA
           ? path.join(dir, "1750262314154-21m00Tcm4TlvDq8ikWAM.mp3")
           : await (async () => {
-              const buf = await synthesize(vid, scr);
-              const p = path.join(dir, `${Date.now()}-${vid}.mp3`);
-              await fs.writeFile(p, buf);
+              // Named by voice and script, so a repeated request reuses the
+              // voice-over and its render is recognised as a duplicate
+              const hash = createHash("sha256")
+                .update(`${vid}\n${scr}`)
+                .digest("hex")
+                .slice(0, 16);
+              const p = path.join(dir, `tts-${hash}-${vid}.mp3`);
+              const exists = await fs.stat(p).then(
+                () => true,
+                () => false
+              );
+              if (!exists) {
+                const buf = await synthesize(vid, scr);
+                const part = `${p}.${randomUUID()}.part`;
+                await fs.writeFile(part, buf);
+                await fs.rename(part, p);
+              }
               return p;
             })();
 
-        const outPath = path.join(dir, `${Date.now()}-${vid}.mp4`);
-        await createVideo({ audioPath, imagePaths: batchImages, outPath });
-        urls.push(`/output/${path.basename(outPath)}`);
+        // Unique names: renders started in the same millisecond must not
+        // overwrite each other
+        const ext = poster !== undefined ? "png" : "mp4";
+        const outPath = path.join(dir, `${randomUUID()}-${vid}.${ext}`);
+        const job = await enqueueVideo({
+          audioPath,
+          imagePaths: batchImages,
+          outPath,
+          priority,
+          preview,
+          poster,
+          extraOutputs,
+        });
+        const url = `/output/${path.basename(job.output)}`;
+        jobs.push({
+          id: job.id,
+          status: job.status,
+          url,
+          subtitlesUrl:
+            preview && poster === undefined
+              ? url.replace(/\.mp4$/, ".vtt")
+              : undefined,
+          outputs: extraOutputs?.map((extra) => extraOutputPath(url, extra)),
+        });
       }
     }
   }
 
-  return NextResponse.json({ urls });
+  // Rendered in the background: poll /api/videos/progress?ids=...
+  return NextResponse.json({ jobs }, { status: 202 });
 }
@@ -108,8 +108,24 @@ export default function Page() {
         throw new Error(`HTTP error! status: ${res.status}`);
       }
 
-      const { urls } = await res.json();
-      setVideoUrls(urls);
+      // Renders are queued: poll them until they finish
+      const { jobs } = await res.json();
+      const ids = jobs.map((job: { id: string }) => job.id).join(",");
+      for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const poll = await fetch(`/api/videos/progress?ids=${ids}`);
+        const { jobs: statuses } = await poll.json();
+        if (statuses.some((job: { status: string } | null) => !job)) {
+          throw new Error("Render job lost");
+        }
+        const failed = statuses.find(
+          (job: { status: string }) => job.status === "error"
+        );
+        if (failed) throw new Error(`Render failed: ${failed.error}`);
+        if (statuses.every((job: { status: string }) => job.status === "done"))
+          break;
+      }
+      setVideoUrls(jobs.map((job: { url: string }) => job.url));
     } catch (error) {
       console.error("Error generating video:", error);
       // Handle error appropriately for your UI
@@ -0,0 +1,185 @@
+// jobQueue.ts
+import { spawn, ChildProcess } from "child_process";
+import path from "node:path";
+import readline from "node:readline";
+import { Readable, Writable } from "node:stream";
+
+/** JSON-lines event from scripts/instrumentation.py (a job's progress). */
+export type RenderEvent = {
+  event: "stage_start" | "stage_end" | "progress" | "render_end" | "profile";
+  time: number;
+  job?: string;
+  stage?: string;
+  ok?: boolean;
+  seconds?: number;
+  frames?: number;
+  total?: number;
+  fps?: number;
+  eta?: number | null;
+  peak_rss_mb?: number | null;
+};
+
+/** One human-readable progress line per event, for the progress stream. */
+export function describeEvent(ev: RenderEvent): string | null {
+  switch (ev.event) {
+    case "stage_start":
+      return `${ev.stage}…`;
+    case "stage_end":
+      return `${ev.stage} ${ev.ok ? "done" : "failed"} in ${ev.seconds}s`;
+    case "progress": {
+      const percent = ev.total ? (100 * (ev.frames ?? 0)) / ev.total : 0;
+      const eta = ev.eta != null ? `, ${Math.ceil(ev.eta)}s left` : "";
+      return `Rendering ${percent.toFixed(1)}% (${ev.frames}/${ev.total} frames, ${ev.fps} fps${eta})`;
+    }
+    case "render_end":
+      return `Video ready in ${ev.seconds}s (${ev.fps} fps)`;
+    default:
+      return null;
+  }
+}
+
+export type JobPriority = "interactive" | "normal" | "batch";
+
+/** A render job as reported by scripts/job_queue.py. */
+export type JobStatus = {
+  id: string;
+  status: "queued" | "running" | "done" | "error";
+  priority: JobPriority;
+  output: string;
+  attempts: number;
+  max_attempts: number;
+  position?: number; // jobs ahead of a queued one
+  progress: RenderEvent | null; // last progress or stage event
+  error: string | null;
+  deduplicated?: boolean; // submit returned an existing job
+};
+
+/** What to render: moviepy_create_video.py argv, transcribe.py argv first. */
+export type JobSpec = {
+  args: string[];
+  transcribe?: string[];
+  priority?: JobPriority;
+};
+
+const pythonCmd = process.platform === "win32" ? "python" : "python3";
+
+type QueueError = { status: "error"; error: string };
+
+type PendingRequest = {
+  command: string;
+  resolve: (reply: unknown) => void;
+  reject: (err: Error) => void;
+};
+
+/**
+ * Client for `python scripts/job_queue.py serve`: one long-lived process
+ * answering submit and status requests as JSON lines, so a progress poll
+ * is a SQLite query rather than a Python start-up, and the modules keying a
+ * submitted job are imported once.
+ */
+class QueueServer {
+  private proc: ChildProcess;
+  private stdin: Writable;
+  private pending = new Map<number, PendingRequest>();
+  private nextRequest = 1;
+
+  constructor(cwd: string) {
+    const script = path.join(cwd, "scripts", "job_queue.py");
+    this.proc = spawn(pythonCmd, [script, "serve"], {
+      cwd,
+      stdio: ["pipe", "pipe", "inherit"],
+    });
+    this.stdin = this.proc.stdin as Writable;
+
+    readline
+      .createInterface({ input: this.proc.stdout as Readable })
+      .on("line", (line) => {
+        let message: { request: number | null; reply: unknown };
+        try {
+          message = JSON.parse(line);
+        } catch {
+          console.log(line);
+          return;
+        }
+        if (message.request == null) return;
+        const request = this.pending.get(message.request);
+        if (!request) return;
+        this.pending.delete(message.request);
+        const reply = message.reply as QueueError;
+        if (reply && !Array.isArray(reply) && reply.status === "error") {
+          const err = `job_queue.py ${request.command} failed: ${reply.error}`;
+          request.reject(new Error(err));
+        } else {
+          request.resolve(message.reply);
+        }
+      });
+
+    this.proc.on("error", (err) => this.close(err));
+    this.proc.on("close", (code) => {
+      this.close(new Error(`job_queue.py serve exited with code ${code}`));
+    });
+  }
+
+  send<T>(command: string, request: object): Promise<T> {
+    const id = this.nextRequest++;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, {
+        command,
+        resolve: resolve as (reply: unknown) => void,
+        reject,
+      });
+      const line = JSON.stringify({ request: id, command, ...request });
+      this.stdin.write(line + "\n");
+    });
+  }
+
+  private close(err: Error) {
+    for (const request of this.pending.values()) request.reject(err);
+    this.pending.clear();
+    if (server === this) server = null;
+  }
+}
+
+let server: QueueServer | null = null;
+
+function queueServer(): QueueServer {
+  if (!server) server = new QueueServer(process.cwd());
+  return server;
+}
+
+/**
+ * Queue a render (or get the identical one already queued, running or
+ * done) and return its status at once; workers render it in the background.
+ */
+export async function submitJob(spec: JobSpec): Promise<JobStatus> {
+  ensureQueueWorkers();
+  return queueServer().send<JobStatus>("submit", { spec });
+}
+
+/** Statuses of jobs, null for unknown ids. */
+export async function jobStatuses(ids: string[]): Promise<(JobStatus | null)[]> {
+  return queueServer().send<(JobStatus | null)[]>("status", { ids });
+}
+
+let workers: ChildProcess | null = null;
+
+/**
+ * Start the queue's `work` processes (RENDER_WORKERS of them, default 2)
+ * unless they already run, here or elsewhere (RENDER_QUEUE_EXTERNAL=true:
+ * `python scripts/job_queue.py work` started separately, e.g. on other
+ * machines sharing the RENDER_QUEUE_DB).
+ */
+export function ensureQueueWorkers() {
+  if (workers || process.env.RENDER_QUEUE_EXTERNAL === "true") return;
+  const cwd = process.cwd();
+  const script = path.join(cwd, "scripts", "job_queue.py");
+  const count = process.env.RENDER_WORKERS ?? "2";
+  workers = spawn(pythonCmd, [script, "work", "--workers", count], {
+    cwd,
+    stdio: ["ignore", "inherit", "inherit"],
+  });
+  workers.on("close", (code) => {
+    console.error(`render queue workers exited with code ${code}`);
+    workers = null;
+  });
+}
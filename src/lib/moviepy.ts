@@ -1,70 +1,91 @@
 // moviepy.ts
-import { spawn } from "child_process";
 import path from "node:path";
 import os from "os";
 import * as fs from "fs";
-import { progressEmitter } from "./progressEmitter";
+import { JobPriority, JobStatus, submitJob } from "./jobQueue";
 
 const USE_FAKE_DATA = process.env.USE_FAKE_DATA === "true";
 
-export async function createVideo(params: {
+/** A file rendered alongside the video: see --extra-output. */
+export type ExtraOutput = {
+  suffix: string; // appended to the video's name, with the extension
+  options?: string; // e.g. "size=900x900" or "scale=0.5,profile=draft"
+};
+
+/** Our publishing set, rendered in the same pass as the 9:16 video. */
+export const DELIVERABLES: ExtraOutput[] = [
+  { suffix: "-square.mp4", options: "size=900x900" },
+  { suffix: "-mobile.mp4", options: "scale=0.5,profile=draft" },
+  { suffix: "-poster.jpg" },
+  { suffix: "-preview.gif" },
+];
+
+/** Where `extra` of the video at `videoPath` is written. */
+export function extraOutputPath(videoPath: string, extra: ExtraOutput) {
+  return videoPath.replace(/\.[^./\\]*$/, "") + extra.suffix;
+}
+
+/**
+ * Queue the render of a video (transcribing its voice-over first) and
+ * return the job's status at once; poll it with jobStatuses. A request
+ * identical to one already queued, running or done returns that job,
+ * whose output may be another file than `outPath`.
+ *
+ * `preview` renders a fast low-resolution draft whose subtitles are a
+ * WebVTT file next to the video instead of burnt in; `poster` only writes
+ * the frame at that time (in seconds) as an image to `outPath` (.png/.jpg),
+ * without subtitles. `extraOutputs` (e.g. DELIVERABLES) are rendered in
+ * the same pass, next to `outPath`; not with `preview` or `poster`.
+ */
+export async function enqueueVideo(params: {
   audioPath?: string; // optional “voice-over” audio
   imagePaths: string[];
   outPath: string;
   enableTransitions?: boolean;
-}) {
+  profile?: "draft" | "social" | "archive"; // encoder settings (quality vs speed)
+  layout?: string; // layout template name (scripts/layouts) or path
+  priority?: JobPriority; // interactive requests go before batches
+  preview?: boolean;
+  poster?: number;
+  extraOutputs?: ExtraOutput[];
+}): Promise<JobStatus> {
   const { audioPath, imagePaths, outPath } = params;
+  const profile = params.profile ?? process.env.VIDEO_PROFILE;
+  const layout = params.layout ?? process.env.VIDEO_LAYOUT;
   const cwd = process.cwd();
-  const script = path.join(cwd, "scripts", "moviepy_create_video.py");
-  const pythonCmd = process.platform === "win32" ? "python" : "python3";
 
-  // Prepare Whisper transcription if there's an audio track
-  let subtitlePath: string | undefined;
+  // Build the MoviePy CLI args
+  const args = ["--output", outPath];
+  if (audioPath) args.push("--audio", audioPath);
+
+  // Whisper transcription if there's an audio track: the queue worker runs
+  // it first and passes the subtitles on (cached by audio hash, so a re-used
+  // voice clip is not transcribed again)
+  let transcribe: string[] | undefined;
   if (USE_FAKE_DATA) {
-    subtitlePath =
-      "C:\\Users\\faraz\\AppData\\Local\\Temp\\whisper_subs\\1750262314154-21m00Tcm4TlvDq8ikWAM.srt";
-  } else if (audioPath) {
+    args.push(
+      "--subtitles",
+      "C:\\Users\\faraz\\AppData\\Local\\Temp\\whisper_subs\\1750262314154-21m00Tcm4TlvDq8ikWAM.srt"
+    );
+  } else if (audioPath && params.poster === undefined) {
     const whisperOutputDir = path.join(cwd, "public", "output", "whisper_subs");
     // Ensure directory exists
     await fs.promises.mkdir(whisperOutputDir, { recursive: true });
 
-    console.log("📝 Transcribing audio with Whisper…");
-    await new Promise<void>((resolve, reject) => {
-      const w = spawn(pythonCmd, [
-        "-m",
-        "whisper",
-        audioPath,
-        "--model",
-        "small",
-        "--language",
-        "en",
-        "--output_format",
-        "srt",
-        "--output_dir",
-        whisperOutputDir,
-      ]);
-
-      w.stdout.on("data", (d) => process.stdout.write(d));
-      w.stderr.on("data", (d) => process.stderr.write(d));
-
-      w.on("close", (code) => {
-        if (code === 0) resolve();
-        else reject(new Error(`Whisper exited with code ${code}`));
-      });
-    });
-
-    // Whisper names the file <audioBasename>.srt
-    const base = path.basename(audioPath, path.extname(audioPath));
-    subtitlePath = path.join(whisperOutputDir, `${base}.srt`);
-    console.log(`✅ Generated subtitles at ${subtitlePath}`);
+    transcribe = [
+      audioPath,
+      "--model",
+      process.env.WHISPER_MODEL ?? "small",
+      "--language",
+      "en",
+      "--output-dir",
+      whisperOutputDir,
+    ];
+    if (process.env.WHISPER_BACKEND)
+      transcribe.push("--backend", process.env.WHISPER_BACKEND);
+    if (process.env.WHISPER_INT8 === "true") transcribe.push("--int8");
   }
 
-
-  // Build the MoviePy CLI args
-  const args = [script, "--output", outPath];
-  if (audioPath) args.push("--audio", audioPath);
-  if (subtitlePath) args.push("--subtitles", subtitlePath);
-
   // static assets
   const introPath = path.join(cwd, "public", "intro.mp4");
   const outroPath = path.join(cwd, "public", "end.jpeg");
@@ -76,36 +97,32 @@ export async function createVideo(params: {
 
   args.push("--fps", "24");
   args.push("--duration", "3");
+  if (profile) args.push("--profile", profile);
+  if (layout) args.push("--layout", layout);
+  // Flat memory per render, so more renders fit on one node
+  if (process.env.VIDEO_LOW_MEMORY === "true")
+    args.push("--engine", "numpy", "--low-memory");
+  if (params.preview) args.push("--preview");
+  if (params.poster !== undefined) args.push("--poster", String(params.poster));
+  for (const extra of params.extraOutputs ?? []) {
+    const spec = extraOutputPath(outPath, extra);
+    args.push(
+      "--extra-output",
+      extra.options ? `${spec},${extra.options}` : spec
+    );
+  }
   args.push(...imagePaths);
 
-  console.log("🎬 Creating video with moviepy:", pythonCmd, args.join(" "));
-  return new Promise<Response>((resolve) => {
-    const proc = spawn(pythonCmd, args);
-
-    proc.stdout.on("data", (d) => {
-      const msg = d.toString();
-      console.log(msg, "test");
-      // progressEmitter.emit("log", msg);
-    });
-    proc.stderr.on("data", (d) => {
-      const msg = d.toString().trimStart();
-      console.error(msg, "testerror");
-      progressEmitter.emit("log", msg);
-    });
-
-    proc.on("close", (code) => {
-      if (code === 0) {
-        resolve(
-          new Response(JSON.stringify({ success: true }), { status: 200 })
-        );
-      } else {
-        resolve(
-          new Response(
-            JSON.stringify({ error: `moviepy exited with code ${code}` }),
-            { status: 500 }
-          )
-        );
-      }
-    });
+  console.log("🎬 Queueing video:", args.join(" "));
+  const job = await submitJob({
+    args,
+    transcribe,
+    priority: params.priority ?? "interactive",
   });
+  console.log(
+    job.deduplicated
+      ? `♻️ Same as job ${job.id} (${job.status})`
+      : `📥 Queued job ${job.id}`
+  );
+  return job;
 }